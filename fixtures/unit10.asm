@@ -0,0 +1,95 @@
+1	JUMP	35
+2	PUSHM	5000
+3	PUSHI	0
+4	LES	
+5	JUMPZ	10
+6	PUSHI	0
+7	PUSHI	1
+8	SUB	
+9	RET	
+10	PUSHM	5000
+11	PUSHI	0
+12	GRT	
+13	JUMPZ	16
+14	PUSHI	1
+15	RET	
+16	PUSHI	0
+17	RET	
+18	PUSHM	5001
+19	PUSHI	10
+20	GRT	
+21	JUMPZ	29
+22	PUSHM	5001
+23	PUSHI	100
+24	GRT	
+25	JUMPZ	28
+26	PUSHI	100
+27	RET	
+28	JUMP	33
+29	PUSHM	5001
+30	PUSHI	1
+31	ADD	
+32	POPM	5001
+33	PUSHM	5001
+34	RET	
+35	PUSHS	
+36	POPM	5002
+37	PUSHM	5002
+38	PUSHI	3
+39	LES	
+40	JUMPZ	44
+41	PUSHI	1
+42	POPS	
+43	JUMP	46
+44	PUSHI	2
+45	POPS	
+46	PUSHM	5002
+47	PUSHI	3
+48	GRT	
+49	JUMPZ	53
+50	PUSHI	3
+51	POPS	
+52	JUMP	55
+53	PUSHI	4
+54	POPS	
+55	PUSHM	5002
+56	PUSHI	3
+57	GRT	
+58	JUMPZ	61
+59	PUSHI	5
+60	POPS	
+61	PUSHM	5002
+62	PUSHI	3
+63	LES	
+64	JUMPZ	67
+65	PUSHI	6
+66	POPS	
+67	LABEL	
+68	PUSHM	5002
+69	PUSHI	200
+70	LES	
+71	JUMPZ	96
+72	PUSHM	5002
+73	POPM	5000
+74	CALL	2
+75	POPS	
+76	PUSHM	5002
+77	POPM	5001
+78	CALL	18
+79	POPS	
+80	PUSHM	5002
+81	PUSHI	55
+82	EQU	
+83	JUMPZ	87
+84	PUSHI	1
+85	POPM	5003
+86	JUMP	89
+87	PUSHI	2
+88	POPM	5003
+89	PUSHM	5003
+90	POPS	
+91	PUSHM	5002
+92	PUSHI	50
+93	ADD	
+94	POPM	5002
+95	JUMP	67
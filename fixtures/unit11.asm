@@ -0,0 +1,99 @@
+1	JUMP	74
+2	PUSHM	5000
+3	PUSHI	2
+4	LES	
+5	JUMPZ	8
+6	PUSHI	1
+7	RET	
+8	PUSHM	5000
+9	PUSHM	5000
+10	PUSHI	1
+11	SUB	
+12	POPM	5000
+13	CALL	2
+14	POPM	5001
+15	POPM	5000
+16	PUSHM	5001
+17	PUSHM	5000
+18	MUL	
+19	RET	
+20	PUSHM	5002
+21	PUSHI	2
+22	LES	
+23	JUMPZ	26
+24	PUSHM	5002
+25	RET	
+26	PUSHM	5002
+27	PUSHM	5002
+28	PUSHI	1
+29	SUB	
+30	POPM	5002
+31	CALL	20
+32	POPM	5003
+33	POPM	5002
+34	PUSHM	5003
+35	PUSHM	5002
+36	PUSHM	5002
+37	PUSHI	2
+38	SUB	
+39	POPM	5002
+40	CALL	20
+41	POPM	5003
+42	POPM	5002
+43	PUSHM	5003
+44	ADD	
+45	RET	
+46	PUSHMF	5004
+47	PUSHC	0
+48	DIVF	
+49	POPMF	5006
+50	PUSHM	5005
+51	PUSHI	1
+52	LES	
+53	JUMPZ	56
+54	PUSHMF	5006
+55	RET	
+56	PUSHMF	5004
+57	PUSHM	5005
+58	PUSHMF	5006
+59	PUSHMF	5006
+60	PUSHM	5005
+61	PUSHI	1
+62	SUB	
+63	POPM	5005
+64	POPMF	5004
+65	CALL	46
+66	POPMF	5007
+67	POPMF	5006
+68	POPM	5005
+69	POPMF	5004
+70	PUSHMF	5007
+71	PUSHMF	5006
+72	ADDF	
+73	RET	
+74	PUSHI	0
+75	POPM	5008
+76	LABEL	
+77	PUSHM	5008
+78	PUSHI	11
+79	LES	
+80	JUMPZ	94
+81	PUSHM	5008
+82	POPM	5000
+83	CALL	2
+84	POPS	
+85	PUSHM	5008
+86	POPM	5002
+87	CALL	20
+88	POPS	
+89	PUSHM	5008
+90	PUSHI	1
+91	ADD	
+92	POPM	5008
+93	JUMP	76
+94	PUSHC	1
+95	PUSHI	3
+96	POPM	5005
+97	POPMF	5004
+98	CALL	46
+99	POPSF	
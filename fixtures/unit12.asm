@@ -0,0 +1,82 @@
+1	PUSHS	
+2	POPM	5000
+3	PUSHI	4
+4	POPM	5001
+5	PUSHI	5
+6	POPM	5002
+7	PUSHM	5000
+8	PUSHM	5001
+9	ADD	
+10	PUSHM	5002
+11	MUL	
+12	PUSHM	5000
+13	PUSHM	5001
+14	ADD	
+15	PUSHM	5002
+16	MUL	
+17	ADD	
+18	POPM	5003
+19	PUSHM	5000
+20	PUSHM	5001
+21	ADD	
+22	PUSHM	5002
+23	MUL	
+24	PUSHM	5003
+25	SUB	
+26	POPM	5004
+27	PUSHM	5003
+28	POPS	
+29	PUSHM	5004
+30	POPS	
+31	PUSHM	5000
+32	PUSHI	1
+33	ADD	
+34	POPM	5000
+35	PUSHM	5000
+36	PUSHM	5001
+37	ADD	
+38	PUSHM	5002
+39	MUL	
+40	PUSHM	5000
+41	PUSHM	5001
+42	ADD	
+43	PUSHM	5002
+44	MUL	
+45	PUSHI	2
+46	MUL	
+47	SUB	
+48	POPM	5004
+49	PUSHM	5004
+50	POPS	
+51	PUSHM	5000
+52	ITOF	
+53	PUSHC	0
+54	MULF	
+55	PUSHM	5001
+56	ITOF	
+57	ADDF	
+58	POPMF	5005
+59	PUSHMF	5005
+60	PUSHC	1
+61	DIVF	
+62	PUSHM	5000
+63	ITOF	
+64	PUSHC	0
+65	MULF	
+66	PUSHM	5001
+67	ITOF	
+68	ADDF	
+69	ADDF	
+70	POPSF	
+71	PUSHM	5000
+72	PUSHM	5001
+73	MUL	
+74	PUSHI	1
+75	ADD	
+76	POPS	
+77	PUSHM	5000
+78	PUSHM	5001
+79	MUL	
+80	PUSHI	1
+81	ADD	
+82	POPS	
@@ -0,0 +1,27 @@
+1	JUMP	10
+2	PUSHI	5
+3	PUSHM	5000
+4	PUSHI	32
+5	SUB	
+6	MUL	
+7	PUSHI	9
+8	DIV	
+9	RET	
+10	PUSHS	
+11	POPM	5001
+12	LABEL	
+13	PUSHM	5001
+14	PUSHM	5002
+15	LES	
+16	JUMPZ	28
+17	PUSHM	5001
+18	POPS	
+19	PUSHM	5001
+20	POPM	5000
+21	CALL	2
+22	POPS	
+23	PUSHM	5001
+24	PUSHM	5003
+25	ADD	
+26	POPM	5001
+27	JUMP	12
@@ -0,0 +1,6 @@
+1	PUSHM	5000
+2	PUSHM	5001
+3	LES	
+4	JUMPZ	7
+5	PUSHM	5002
+6	POPM	5000
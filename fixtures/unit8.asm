@@ -0,0 +1,38 @@
+1	JUMP	6
+2	PUSHMF	5000
+3	PUSHC	0
+4	DIVF	
+5	RET	
+6	PUSHS	
+7	POPM	5001
+8	PUSHM	5001
+9	ITOF	
+10	POPMF	5002
+11	PUSHMF	5002
+12	POPMF	5000
+13	CALL	2
+14	PUSHC	1
+15	ADDF	
+16	POPMF	5003
+17	PUSHMF	5003
+18	PUSHI	3
+19	ITOF	
+20	MULF	
+21	FTOI	
+22	POPM	5001
+23	PUSHI	true
+24	POPM	5004
+25	PUSHM	5001
+26	PUSHI	4
+27	GRT	
+28	JUMPZ	31
+29	PUSHI	false
+30	POPM	5004
+31	PUSHM	5004
+32	PUSHI	true
+33	EQU	
+34	JUMPZ	37
+35	PUSHMF	5003
+36	POPSF	
+37	PUSHM	5001
+38	POPS	
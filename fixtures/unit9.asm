@@ -0,0 +1,46 @@
+1	PUSHI	2
+2	PUSHI	3
+3	MUL	
+4	PUSHI	1
+5	ADD	
+6	POPM	5000
+7	PUSHM	5000
+8	POPM	5001
+9	PUSHM	5001
+10	PUSHI	1
+11	ADD	
+12	POPM	5002
+13	PUSHM	5000
+14	POPM	5000
+15	PUSHM	5002
+16	PUSHI	2
+17	MUL	
+18	POPM	5003
+19	PUSHM	5003
+20	POPS	
+21	LABEL	
+22	PUSHI	1
+23	PUSHI	2
+24	LES	
+25	JUMPZ	47
+26	PUSHM	5002
+27	PUSHI	10
+28	GRT	
+29	JUMPZ	32
+30	PUSHI	0
+31	POPM	5002
+32	LABEL	
+33	PUSHM	5001
+34	PUSHM	5002
+35	LES	
+36	JUMPZ	42
+37	PUSHM	5001
+38	PUSHM	5000
+39	ADD	
+40	POPM	5001
+41	JUMP	32
+42	PUSHM	5002
+43	PUSHI	1
+44	ADD	
+45	POPM	5002
+46	JUMP	21
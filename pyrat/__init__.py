@@ -0,0 +1,25 @@
+# pyrat - Rat15su language compiler
+# Copyright Kevin Mittman <kmittman@csu.fullerton.edu>
+# (C) 2015 All Rights Reserved.
+
+# The compiler as a library. Importing it runs no command line code and
+# reads no files; the modules only --ir/--ssa, --cache and the command
+# line need are loaded on first use
+from .defaults import version
+from .lexer import Source, Token, TokenArray, open_source, tokenize, tokenize_array, tokenize_parallel, relex
+from .assembly import OPCODES, SymbolTable, InstrBuffer, LineTable, peephole
+from .compiler import Compiler, compile_source, compile_file, run
+
+LAZY = {
+	"IR": "ir", "lift": "ir", "validate": "ir", "lower": "ir", "dominators": "ir",
+	"CompileCache": "cache",
+	"Object": "ratc", "load_object": "ratc", "write_object": "ratc",
+	"main": "cli", "batch": "cli", "golden": "cli", "benchmark": "cli", "startup": "cli", "lex_bench": "cli", "generate": "cli", "watch": "cli",
+}
+
+
+def __getattr__(name):
+	if name in LAZY:
+		from importlib import import_module
+		return getattr(import_module("." + LAZY[name], __name__), name)
+	raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
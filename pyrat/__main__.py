@@ -0,0 +1,4 @@
+# python -m pyrat [option] [file]
+from .cli import main
+
+main()
@@ -0,0 +1,545 @@
+# Instructions, symbols and source positions of the generated code, and
+# the peephole optimizer
+
+from array import array
+
+
+class SymbolTable:
+	# Variables of every type draw addresses from one counter, in order of
+	# first reference, and are integers until declared otherwise. Literals
+	# that do not fit an instruction go to a pool of constants instead,
+	# one entry per distinct value. Between enter() and leave() names
+	# declared are local to a function: cells of their own that shadow
+	# the globals, listed as function.name
+	def __init__(self, base=5000):
+		self.base = base
+		self.clear()
+
+	def clear(self):
+		self.ids = {}
+		self.types = {}
+		self.refs = {}
+		self.next = self.base
+		self.constants = []
+		self.pool = {}
+		self.scope = None
+		self.prefix = ""
+
+	def __len__(self):
+		return len(self.ids) + len(self.constants)
+
+	def enter(self, name):
+		self.scope = {}
+		self.prefix = name + "."
+
+	def leave(self):
+		self.scope = None
+		self.prefix = ""
+
+	def lookup(self, lexeme, local=False):
+		# Address of a name, None if not seen yet; local=True looks in the
+		# innermost scope only, the one a declaration goes to
+		if self.scope is not None and (local or lexeme in self.scope):
+			return self.scope.get(lexeme)
+		return self.ids.get(lexeme)
+
+	def address(self, token, lexeme):
+		addr = self.lookup(lexeme)
+		if addr == None:
+			addr = self.ids[lexeme] = self.next
+			self.refs[addr] = 0
+			self.next += 1
+		self.refs[addr] += 1
+		return addr
+
+	def declare(self, lexeme, qualifier):
+		if self.scope is not None and lexeme not in self.scope:
+			addr = self.scope[lexeme] = self.ids[self.prefix + lexeme] = self.next
+			self.refs[addr] = 0
+			self.next += 1
+		addr = self.address("identifier", lexeme)
+		self.types[addr] = qualifier
+		return addr
+
+	def type(self, addr):
+		return self.types.get(addr, "integer")
+
+	def temporary(self, qualifier):
+		# A cell no identifier names, e.g. for the SSA lowering
+		addr = self.next
+		self.types[addr] = qualifier
+		self.next += 1
+		return addr
+
+	def constant(self, value):
+		index = self.pool.get(value)
+		if index == None:
+			index = self.pool[value] = len(self.constants)
+			self.constants.append(value)
+		return index
+
+	def references(self):
+		# (identifier, address, reference count) in address order
+		for lexeme, addr in self.ids.items():
+			yield lexeme, addr, self.refs[addr]
+
+
+# Opcodes. Booleans are integers 0 and 1; reals have instructions of
+# their own, with an F, and PUSHC for a real from the constant pool
+OPCODES = ["PUSHI", "PUSHM", "POPM", "PUSHS", "POPS", "ADD", "SUB", "MUL", "DIV", "LES", "GRT", "EQU", "NEQ", "JUMPZ", "JUMP", "LABEL", "CALL", "RET",
+           "PUSHC", "PUSHMF", "POPMF", "PUSHSF", "POPSF", "ADDF", "SUBF", "MULF", "DIVF", "LESF", "GRTF", "EQUF", "NEQF", "ITOF", "FTOI"]
+PUSHI, PUSHM, POPM, PUSHS, POPS, ADD, SUB, MUL, DIV, LES, GRT, EQU, NEQ, JUMPZ, JUMP, LABEL, CALL, RET, \
+	PUSHC, PUSHMF, POPMF, PUSHSF, POPSF, ADDF, SUBF, MULF, DIVF, LESF, GRTF, EQUF, NEQF, ITOF, FTOI = range(len(OPCODES))
+
+# Real counterpart of each integer operation, and the operations whose
+# result is a real
+REAL_OPS = dict(zip(range(ADD, NEQ + 1), range(ADDF, NEQF + 1)))
+REAL_RESULTS = frozenset([PUSHC, PUSHMF, PUSHSF, ADDF, SUBF, MULF, DIVF, ITOF])
+
+# Values each opcode takes off the stack and puts back; CALL puts back
+# the callee's result, a RET in a function takes it
+STACK_IN = [2 if ADD <= op <= NEQ or ADDF <= op <= NEQF else 1 if op in (POPM, POPS, JUMPZ, POPMF, POPSF, ITOF, FTOI) else 0
+            for op in range(len(OPCODES))]
+STACK_OUT = [1 if op in (PUSHI, PUSHM, PUSHS, PUSHC, PUSHMF, PUSHSF, CALL, ITOF, FTOI) or ADD <= op <= NEQ or ADDF <= op <= NEQF else 0
+             for op in range(len(OPCODES))]
+
+# Operand flags
+F_NONE, F_INT, F_STR = range(3)
+
+
+class InstrBuffer:
+	# Instruction table as parallel columns, addressed from 1. Operands
+	# that are not plain integers (e.g. PUSHI true) are kept in a side
+	# list and referenced by index
+	def __init__(self):
+		self.clear()
+
+	def clear(self):
+		self.op = array('B')
+		self.oprnd = array('q')
+		self.flags = array('B')
+		self.strings = []
+
+	def __len__(self):
+		return len(self.op)
+
+	def encode(self, oprnd):
+		if oprnd == None:
+			return F_NONE, 0
+		if type(oprnd) is not int:
+			try:
+				value = int(oprnd)
+			except (TypeError, ValueError):
+				value = None
+			if value == None or str(value) != oprnd:
+				self.strings.append(oprnd)
+				return F_STR, len(self.strings) - 1
+			oprnd = value
+		if -2**63 <= oprnd < 2**63:
+			return F_INT, oprnd
+		self.strings.append(oprnd)
+		return F_STR, len(self.strings) - 1
+
+	def append(self, op, oprnd=None):
+		flag, value = self.encode(oprnd)
+		self.op.append(op)
+		self.oprnd.append(value)
+		self.flags.append(flag)
+		return len(self.op)
+
+	def patch(self, addr, oprnd):
+		flag, value = self.encode(oprnd)
+		self.oprnd[addr-1] = value
+		self.flags[addr-1] = flag
+
+	def operand(self, addr):
+		flag = self.flags[addr-1]
+		if flag == F_INT:
+			return self.oprnd[addr-1]
+		elif flag == F_STR:
+			return self.strings[self.oprnd[addr-1]]
+		return None
+
+	def rows(self):
+		# Listing view: (address, op name, operand or None)
+		for i in range(len(self.op)):
+			yield i + 1, OPCODES[self.op[i]], self.operand(i + 1)
+
+
+class LineTable:
+	# Source position of each instruction: the line of the statement that
+	# generated it and the columns (from 1, inclusive) it spans on that
+	# line. Kept as runs, each the first address of a stretch of
+	# instructions with the same position, in address order. encode()
+	# packs the runs as deltas from the previous run; the line index for
+	# addresses() is built on first use
+	def __init__(self):
+		self.clear()
+
+	def clear(self):
+		self.addr = array('i')
+		self.line = array('i')
+		self.first = array('i')
+		self.last = array('i')
+		self.size = 0
+		self.order = None
+		self.position = None
+
+	def __len__(self):
+		return len(self.addr)
+
+	def mark(self, addr, line, first, last):
+		# Instructions from addr on are at line, columns first..last
+		position = (line, first, last)
+		if position == self.position:
+			return
+		self.position = position
+		if self.addr and self.addr[-1] == addr:
+			self.line[-1] = line
+			self.first[-1] = first
+			self.last[-1] = last
+		else:
+			self.addr.append(addr)
+			self.line.append(line)
+			self.first.append(first)
+			self.last.append(last)
+		self.order = None
+
+	def close(self, size):
+		# The instruction table ends at address size
+		while self.addr and self.addr[-1] > size:
+			for column in (self.addr, self.line, self.first, self.last):
+				column.pop()
+		self.size = size
+		self.order = None
+		self.position = None
+
+	def find(self, addr):
+		# (line, first column, last column) of an address, None if unknown
+		from bisect import bisect_right
+		i = bisect_right(self.addr, addr) - 1
+		if i < 0 or addr > self.size:
+			return None
+		return self.line[i], self.first[i], self.last[i]
+
+	def runs(self):
+		# (first address, last address, line, first column, last column)
+		ends = list(self.addr[1:]) + [self.size + 1]
+		for addr, end, line, first, last in zip(self.addr, ends, self.line, self.first, self.last):
+			yield addr, end - 1, line, first, last
+
+	def addresses(self, line):
+		# Address ranges (first, last) generated by a line
+		from bisect import bisect_left, bisect_right
+		if self.order is None:
+			self.order = sorted(range(len(self.addr)), key=self.line.__getitem__)
+			self.keys = array('i', [self.line[i] for i in self.order])
+		ranges = []
+		for i in self.order[bisect_left(self.keys, line):bisect_right(self.keys, line)]:
+			first = self.addr[i]
+			last = self.addr[i+1] - 1 if i + 1 < len(self.addr) else self.size
+			if ranges and ranges[-1][1] + 1 == first:
+				ranges[-1] = (ranges[-1][0], last)
+			else:
+				ranges.append((first, last))
+		return ranges
+
+	def remap(self, origins):
+		# Positions for a rewritten table: its address k came from
+		# address origins[k-1] of this one. Origins mostly ascend, so the
+		# run found last is tried before searching
+		from bisect import bisect_right
+		result = LineTable()
+		lo = hi = 0
+		n = len(self.addr)
+		for k, old in enumerate(origins, 1):
+			if not lo <= old < hi:
+				i = bisect_right(self.addr, old) - 1
+				if i < 0:
+					continue
+				lo = self.addr[i]
+				hi = self.addr[i+1] if i + 1 < n else self.size + 1
+				result.mark(k, self.line[i], self.first[i], self.last[i])
+		result.close(len(origins))
+		return result
+
+	def encode(self):
+		# Size, then per run the address, line and first column as
+		# differences from the previous run and the width, each a zigzag
+		# varint (7 bits a byte, sign in the lowest bit)
+		out = bytearray()
+		values = [self.size]
+		addr = line = first = 0
+		for a, l, f, t in zip(self.addr, self.line, self.first, self.last):
+			values.extend((a - addr, l - line, f - first, t - f))
+			addr, line, first = a, l, f
+		for v in values:
+			v = v << 1 if v >= 0 else (-v << 1) - 1
+			while v > 127:
+				out.append(v & 127 | 128)
+				v >>= 7
+			out.append(v)
+		return bytes(out)
+
+	@classmethod
+	def decode(cls, data):
+		values = []
+		v = shift = 0
+		for byte in data:
+			v |= (byte & 127) << shift
+			if byte > 127:
+				shift += 7
+				continue
+			values.append(v >> 1 if not v & 1 else -(v >> 1) - 1)
+			v = shift = 0
+		table = cls()
+		addr = line = first = 0
+		for i in range(1, len(values) - 3, 4):
+			addr += values[i]
+			line += values[i+1]
+			first += values[i+2]
+			table.addr.append(addr)
+			table.line.append(line)
+			table.first.append(first)
+			table.last.append(first + values[i+3])
+		table.size = values[0] if values else 0
+		return table
+
+
+# Binary operators: precedence and opcode
+BINARY = {"+": (1, ADD), "-": (1, SUB), "*": (2, MUL), "/": (2, DIV)}
+RELOPS = {"<": LES, ">": GRT, "==": EQU, "!=": NEQ}
+
+
+def reduce_expr(nodes, op):
+	# A real on either side makes the operation real
+	right = nodes.pop()
+	left = nodes.pop()
+	if is_real(left) or is_real(right):
+		left, right, op = coerce(left, "real"), coerce(right, "real"), REAL_OPS[op]
+	nodes.append((op, left, right))
+
+
+def is_real(node):
+	if node[0] == CALL:
+		return node[1].type == "real"
+	return node[0] in REAL_RESULTS
+
+
+def coerce(node, qualifier):
+	# The node converted for a variable of type qualifier; conversions
+	# are unary nodes (op, operand, None)
+	if qualifier == "real" and not is_real(node):
+		return (ITOF, node, None)
+	elif qualifier != "real" and is_real(node):
+		return (FTOI, node, None)
+	return node
+
+
+# Longest function body -O expands at call sites
+INLINE_LIMIT = 24
+QUALIFIERS = ("integer", "boolean", "real")
+
+
+class Function:
+	# A compiled function. Arguments are passed in the memory cells of
+	# its parameters: the caller pops them there, then CALLs entry and
+	# finds the result of `return <Expression>` on the stack. body holds
+	# the instructions of a small function that calls nothing, for the
+	# inliner, and is None otherwise. type is that of the first value
+	# returned, None before the parser sees one. A call to itself keeps
+	# the caller's cells on the stack and parks the result in the cell
+	# result meanwhile
+	def __init__(self, name, params, entry):
+		self.name = name
+		self.params = params
+		self.entry = entry
+		self.body = None
+		self.type = None
+		self.result = None
+
+	def inline(self, base):
+		# The body relocated to start at base; a return jumps past its end
+		end = base + len(self.body)
+		for op, oprnd in self.body:
+			if op == RET:
+				op, oprnd = JUMP, end
+			elif op == JUMP or op == JUMPZ:
+				oprnd = base + oprnd - self.entry
+			yield op, oprnd
+
+
+def fold(op, a, b):
+	# Value of a constant binary op the way execute() computes it, or
+	# None to leave it for run time
+	if op == ADD:
+		return a + b
+	elif op == SUB:
+		return a - b
+	elif op == MUL:
+		return a * b
+	elif op == DIV:
+		if b == 0:
+			return None
+		q = abs(a) // abs(b)
+		return q if (a < 0) == (b < 0) else -q
+	elif op == LES:
+		return 1 if a < b else 0
+	elif op == GRT:
+		return 1 if a > b else 0
+	elif op == EQU:
+		return 1 if a == b else 0
+	elif op == NEQ:
+		return 1 if a != b else 0
+	return None
+
+
+def underflow(ops, targets):
+	# First address (from 1) where code reachable from the main program
+	# or a function entry would take a value off an empty stack, or
+	# return from a function without one; None if there is none. targets
+	# holds the 0-based target of each JUMP, JUMPZ and CALL. Each address
+	# is walked again only at a lower depth than before, so this is about
+	# one pass over the code
+	size = len(ops)
+	entries = sorted(set(targets[pc] for pc in range(size) if ops[pc] == CALL))
+	low = [None] * size
+	for entry in [0] + entries:
+		pending = [(entry, 0)]
+		while pending:
+			pc, depth = pending.pop()
+			while pc < size and (low[pc] is None or depth < low[pc]):
+				low[pc] = depth
+				op = ops[pc]
+				if depth < STACK_IN[op] or op == RET and entry and depth < 1:
+					return pc + 1
+				if op == RET:
+					break
+				depth += STACK_OUT[op] - STACK_IN[op]
+				if op == JUMP:
+					pc = targets[pc]
+					continue
+				if op == JUMPZ:
+					pending.append((targets[pc], depth))
+				pc += 1
+	return None
+
+
+# Memory instruction pairs: the load for each store and the other way round
+STORES = {POPM: PUSHM, POPMF: PUSHMF}
+LOADS = {PUSHM: POPM, PUSHMF: POPMF}
+
+
+def peephole(table, lines=None):
+	# Optimize an instruction table, one pass at a time until a pass
+	# removes nothing. Returns (new table, instructions removed), and the
+	# LineTable lines carried over to the new table if given
+	removed = 0
+	while True:
+		size = len(table)
+		table, origins = peephole_pass(table)
+		if lines is not None:
+			lines = lines.remap(origins)
+		if len(table) == size:
+			return (table, removed) if lines is None else (table, removed, lines)
+		removed += size - len(table)
+
+
+def peephole_pass(table):
+	# Rewrites the tail of the output as each instruction is appended:
+	#   PUSHI a, PUSHI b, op  ->  PUSHI (a op b)
+	#   PUSHI c, JUMPZ t      ->  JUMP t, or nothing when c is true
+	#   PUSHM x, POPM x       ->  nothing
+	#   POPM x, PUSHM x       ->  nothing, if no other PUSHM reads x
+	# (the last two for PUSHMF/POPMF as well)
+	# Jumps are threaded through LABEL/JUMP chains first, then LABELs no
+	# jump lands on and JUMPs to the next address are dropped. Rewrites
+	# never reach back past a jump target, and targets are renumbered at
+	# the end. Returns the new table and, for each of its instructions,
+	# the address it came from
+	size = len(table)
+	ops = table.op
+	args = [table.operand(addr) for addr in range(1, size + 1)]
+
+	def const(i):
+		return out[i][0] == PUSHI and type(out[i][1]) is int
+
+	def thread(t):
+		seen = set()
+		while t != None and t not in seen:
+			seen.add(t)
+			u = t
+			while u <= size and ops[u-1] == LABEL:
+				u += 1
+			if u > size or ops[u-1] != JUMP:
+				break
+			t = args[u-1]
+		return t
+
+	reads = {}
+	targets = set()
+	for addr in range(1, size + 1):
+		op = ops[addr-1]
+		if op == PUSHM or op == PUSHMF:
+			reads[args[addr-1]] = reads.get(args[addr-1], 0) + 1
+		elif op == JUMP or op == JUMPZ or op == CALL:
+			args[addr-1] = thread(args[addr-1])
+			targets.add(args[addr-1])
+
+	out = []
+	origins = []
+	new = [0] * (size + 2)
+	barrier = 0
+	for addr in range(1, size + 1):
+		op = ops[addr-1]
+		oprnd = args[addr-1]
+		if addr in targets:
+			barrier = len(out)
+		new[addr] = len(out) + 1
+
+		if op == LABEL and addr not in targets:
+			continue
+		elif op == LABEL and out and out[-1][0] == LABEL:
+			# Second of two adjacent targeted LABELs
+			new[addr] = len(out)
+			barrier = len(out) - 1
+			continue
+		elif op == JUMP and oprnd == addr + 1:
+			continue
+
+		out.append((op, oprnd))
+		origins.append(addr)
+		while True:
+			n = len(out) - barrier
+			last = out[-1]
+			if n >= 3 and ADD <= last[0] <= NEQ and const(-2) and const(-3):
+				value = fold(last[0], out[-3][1], out[-2][1])
+				if value == None:
+					break
+				out[-3:] = [(PUSHI, value)]
+				del origins[-3:-1]
+			elif n >= 2 and last[0] == JUMPZ and const(-2):
+				if out[-2][1]:
+					out[-2:] = []
+					del origins[-2:]
+				else:
+					out[-2:] = [(JUMP, last[1])]
+					del origins[-2]
+			elif n >= 2 and last[0] in STORES and out[-2] == (STORES[last[0]], last[1]):
+				out[-2:] = []
+				del origins[-2:]
+			elif n >= 2 and last[0] in LOADS and out[-2] == (LOADS[last[0]], last[1]) and reads[last[1]] == 1:
+				out[-2:] = []
+				del origins[-2:]
+			else:
+				break
+			if len(out) == 0:
+				break
+	new[size + 1] = len(out) + 1
+
+	result = InstrBuffer()
+	for op, oprnd in out:
+		if (op == JUMP or op == JUMPZ or op == CALL) and oprnd != None:
+			oprnd = new[oprnd]
+		result.append(op, oprnd)
+	return result, origins
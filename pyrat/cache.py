@@ -0,0 +1,156 @@
+# On-disk cache of compiled units
+
+EVENTS = ("hit", "miss", "store", "evict")
+
+import os, time, hashlib, marshal
+
+from .defaults import cache_limit, version
+
+
+class CompileCache:
+	# On-disk store of compiled units, one marshal file per entry named by
+	# a hash of the source bytes, compiler version and mode. Hits touch
+	# the entry, so evicting by mtime drops the least recently used.
+	# Events are appended to a log that evict() folds into fixed counters
+	def __init__(self, path, limit=cache_limit):
+		self.path = path
+		self.limit = limit
+		os.makedirs(path, exist_ok=True)
+
+	def key(self, data, mode):
+		h = hashlib.sha256("{0}\0{1}\0".format(version, mode).encode())
+		h.update(data)
+		return h.hexdigest()
+
+	def entry(self, key):
+		return os.path.join(self.path, key + ".unit")
+
+	def load(self, key):
+		path = self.entry(key)
+		try:
+			with open(path, 'rb') as f:
+				unit = marshal.load(f)
+			os.utime(path)
+		except FileNotFoundError:
+			self.count("miss")
+			return None
+		except (OSError, EOFError, ValueError, TypeError):
+			# Torn or foreign entry, recompile over it
+			self.discard(path)
+			self.count("miss")
+			return None
+		self.count("hit")
+		return unit
+
+	def store(self, key, unit):
+		# Write aside and rename, so readers never see half an entry
+		path = self.entry(key)
+		tmp = "{0}.{1}.tmp".format(path, os.getpid())
+		with open(tmp, 'wb') as f:
+			marshal.dump(unit, f)
+		os.replace(tmp, path)
+		self.count("store")
+
+	def discard(self, path):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+
+	def count(self, event):
+		# One line per event; appends are safe from parallel batch workers
+		with open(os.path.join(self.path, "stats"), 'a') as f:
+			f.write(event + "\n")
+
+	def totals(self):
+		# Counters folded so far
+		counts = dict.fromkeys(EVENTS, 0)
+		try:
+			with open(os.path.join(self.path, "totals")) as f:
+				for line in f:
+					event, sep, value = line.partition(" ")
+					if event in counts:
+						counts[event] = int(value)
+		except (FileNotFoundError, ValueError):
+			pass
+		return counts
+
+	def tally(self, path, counts):
+		try:
+			with open(path) as f:
+				for line in f:
+					event = line.strip()
+					if event in counts:
+						counts[event] += 1
+		except FileNotFoundError:
+			pass
+		return counts
+
+	def fold(self):
+		# Add the log to the totals and start it over. One process folds at
+		# a time, the others leave the log for the next evict(); a lock
+		# left by a crash is taken over after a minute. The log is renamed
+		# before it is read, appends from then on go to a new one
+		lock = os.path.join(self.path, "stats.lock")
+		try:
+			os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+		except FileExistsError:
+			try:
+				if time.time() - os.path.getmtime(lock) < 60:
+					return
+				os.utime(lock)
+			except OSError:
+				return
+		try:
+			log = os.path.join(self.path, "stats")
+			folding = "{0}.{1}.fold".format(log, os.getpid())
+			try:
+				os.replace(log, folding)
+			except FileNotFoundError:
+				return
+			counts = self.tally(folding, self.totals())
+			tmp = "{0}.{1}.tmp".format(os.path.join(self.path, "totals"), os.getpid())
+			with open(tmp, 'w') as f:
+				for event in EVENTS:
+					f.write("{0} {1}\n".format(event, counts[event]))
+			os.replace(tmp, os.path.join(self.path, "totals"))
+			self.discard(folding)
+		finally:
+			self.discard(lock)
+
+	def entries(self):
+		# (mtime, size, path) of every entry, least recently used first
+		found = []
+		for e in os.scandir(self.path):
+			if e.name.endswith(".unit"):
+				try:
+					st = e.stat()
+				except OSError:
+					continue
+				found.append((st.st_mtime, st.st_size, e.path))
+		found.sort()
+		return found
+
+	def evict(self):
+		found = self.entries()
+		total = sum(size for mtime, size, path in found)
+		for mtime, size, path in found:
+			if total <= self.limit:
+				break
+			self.discard(path)
+			self.count("evict")
+			total -= size
+		self.fold()
+
+	def report(self):
+		counts = self.tally(os.path.join(self.path, "stats"), self.totals())
+		found = self.entries()
+		lookups = counts["hit"] + counts["miss"]
+		print("==> cache " + self.path)
+		print("{0:15} {1}".format("entries", len(found)))
+		print("{0:15} {1} / {2} bytes".format("size", sum(size for mtime, size, path in found), self.limit))
+		print("{0:15} {1}".format("hits", counts["hit"]))
+		print("{0:15} {1}".format("misses", counts["miss"]))
+		print("{0:15} {1:.1f}%".format("hit rate", 100.0 * counts["hit"] / lookups if lookups else 0.0))
+		print("{0:15} {1}".format("stores", counts["store"]))
+		print("{0:15} {1}".format("evictions", counts["evict"]))
@@ -0,0 +1,660 @@
+# Command line: options, batch and golden runs, benchmarks, --watch
+
+import os, sys
+
+from .assembly import RELOPS
+from .compiler import Compiler, GOLDEN, compile_file, fixtures, load_fixtures, run, save_fixture
+from .defaults import cache_limit, recover_limit, version
+from .lexer import Source, relex, tokenize_array, tokenize_parallel
+from .listing import FORMATS
+from .trace import Profile, collapse
+
+
+def print_usage():
+	print("USAGE: pyrat.py [file]")
+	print("USAGE: pyrat.py % [file]")
+	print("USAGE: pyrat.py [--|-a|-l|-s|-y] [file]")
+	print("USAGE: pyrat.py [--debug] [file]")
+	print("USAGE: pyrat.py [--run] [file]")
+	print("USAGE: pyrat.py [--test|--rules|--vm-bench]")
+	print("USAGE: pyrat.py --golden [--jobs=N] [--update]")
+	print("USAGE: pyrat.py --watch [--interval=S] [-s|-a|-y] file")
+	print("USAGE: pyrat.py --batch [--jobs=N] [file|dir ...]")
+	print("USAGE: pyrat.py --bench [--size=N[K|M]] [--depth=N] [--expr=N] [--ids=N] [--seed=N] [--repeat=N] [--peak=0] [--save=file]")
+	print("USAGE: pyrat.py [--jobs=N] --lex-bench [--size=N[K|M]] [--seed=N] [--repeat=N]")
+	print("USAGE: pyrat.py --startup [--repeat=N] [--budget=MS]")
+	print("USAGE: pyrat.py -O [%|--|-a|-y|--run] [file]")
+	print("USAGE: pyrat.py [-O] [--ssa] --ir [file]")
+	print("USAGE: pyrat.py --ssa [%|--|-a|-y|--run] [file]")
+	print("USAGE: pyrat.py [-O] [--ssa] --annotate [file]")
+	print("USAGE: pyrat.py [-O] [--ssa] [--strip] --ratc [file]")
+	print("USAGE: pyrat.py [-O] [--disasm|--run|-y|--ir] file.ratc")
+	print("USAGE: pyrat.py --format=text|tsv|ndjson [option] [file]")
+	print("USAGE: pyrat.py --profile[=stacks.txt] [option] [file]")
+	print("USAGE: pyrat.py --cache=DIR [--cache-size=MB] [--cache-stats] [option] [file]")
+	print("USAGE: pyrat.py --recover[=N] [option|--batch|--watch] [file]")
+	print("USAGE: pyrat.py --jobs=N [option] [file]")
+
+
+def batch(args, cache=None, optimize=False, format="text", recover=0):
+	# Compile many files (directories are searched for *.rat) across a
+	# process pool; returns the worst exit code
+	import time
+	from itertools import repeat
+	from concurrent.futures import ProcessPoolExecutor
+	from .cache import CompileCache
+	jobs = os.cpu_count() or 1
+	paths = []
+	for arg in args:
+		if arg.startswith("--jobs="):
+			jobs = int(arg[7:])
+		elif os.path.isdir(arg):
+			for root, dirs, files in os.walk(arg):
+				dirs.sort()
+				paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(".rat"))
+		elif os.path.isfile(arg):
+			paths.append(arg)
+		else:
+			print("ARRRR: Argument must be a valid file name:", arg)
+			return 2
+
+	if not paths:
+		print_usage()
+		return 1
+
+	start = time.perf_counter()
+	failed = []
+	worst = 0
+	with ProcessPoolExecutor(jobs) as pool:
+		chunk = max(1, len(paths) // (jobs * 4))
+		for path, code, console, elapsed in pool.map(compile_file, paths, repeat(cache), repeat(optimize), repeat(format), repeat(recover), chunksize=chunk):
+			if code:
+				failed.append(path)
+				worst = max(worst, code)
+				print("FAIL {0:6.3f}s {1} (exit {2})".format(elapsed, path, code))
+				for line in console.splitlines():
+					if line and not line.startswith("==>"):
+						print("     " + line)
+			else:
+				print("OK   {0:6.3f}s {1}".format(elapsed, path))
+
+	print("==> compiled {0} files, {1} ok, {2} failed in {3:.3f}s".format(len(paths), len(paths) - len(failed), len(failed), time.perf_counter() - start))
+	if cache is not None:
+		CompileCache(*cache).evict()
+	return worst
+
+
+def check_unit(n, mode, update=False):
+	# Golden runner worker: unit test n in one of the GOLDEN modes, in
+	# memory. Returns (unit, mode, exit code, errors, console output,
+	# rows produced when updating)
+	import contextlib, io
+	console = io.StringIO()
+	c = Compiler()
+	c.logfile = False
+	c.update = update
+	if mode == "--test":
+		c.test = True
+		c.stage = 1
+	elif mode == "--rules":
+		c.rules = True
+		c.verbose = True
+		c.stage = 2
+	else:
+		c.memory = True
+		c.optimize = mode == "-O"
+		c.ssa = mode == "--ssa"
+		c.run = mode == "--run"
+		c.stage = 3
+	code = 0
+	try:
+		with contextlib.redirect_stdout(console), contextlib.redirect_stderr(console):
+			c.unit_test(n)
+			c.flush()
+	except SystemExit as e:
+		code = e.code if isinstance(e.code, int) else 1
+	return n, mode, code, c.errors, console.getvalue(), c.actual
+
+
+def golden(args):
+	# Run every fixture unit test in the modes it has expected rows for,
+	# across a process pool. --update rewrites the expected rows from
+	# what the compiler produces now, and gives new cases (a unitN.rat
+	# alone) all of them. Returns 1 if anything failed
+	import time
+	from itertools import repeat
+	from concurrent.futures import ProcessPoolExecutor
+	jobs = os.cpu_count() or 1
+	update = False
+	for arg in args:
+		if arg.startswith("--jobs="):
+			jobs = int(arg[7:])
+		elif arg == "--update":
+			update = True
+		else:
+			print_usage()
+			return 1
+
+	units = []
+	modes = []
+	for n, case in sorted(load_fixtures().items()):
+		found = [mode for mode, kinds in GOLDEN.items() if any(kind in case for kind in kinds)]
+		if update and not found:
+			found = list(GOLDEN)
+		for mode in found:
+			units.append(n)
+			modes.append(mode)
+
+	start = time.perf_counter()
+	failed = 0
+	updated = 0
+	with ProcessPoolExecutor(jobs) as pool:
+		for n, mode, code, errors, console, actual in pool.map(check_unit, units, modes, repeat(update)):
+			name = "unit{0} {1}".format(n, mode)
+			if code or errors:
+				failed += 1
+				print("FAIL {0} (exit {1}, {2} errors)".format(name, code, errors))
+				for line in console.splitlines():
+					if line and not line.startswith("==>"):
+						print("     " + line)
+			elif update and any(actual.get(kind, []) != fixtures[n].get(kind, []) for kind in GOLDEN[mode]):
+				updated += 1
+				for kind in GOLDEN[mode]:
+					if actual.get(kind, []) != fixtures[n].get(kind, []):
+						save_fixture(n, kind, actual.get(kind, []))
+				print("UPD  {0}".format(name))
+			else:
+				print("OK   {0}".format(name))
+
+	print("==> ran {0} golden tests, {1} ok, {2} updated, {3} failed in {4:.3f}s".format(len(units), len(units) - failed - updated, updated, failed, time.perf_counter() - start))
+	return 1 if failed else 0
+
+
+def generate(out, size, seed=0, depth=3, width=4, ids=16):
+	# Write a random but valid Rat15su program of about size bytes to out:
+	# one declaration, then statements nested up to depth with up to
+	# width operands per expression over ids identifiers. Same seed, same
+	# program
+	import random
+	rng = random.Random(seed)
+	names = []
+	for i in range(max(1, ids)):
+		# v, va, vb, ... letters only, a digit before a separator lexes
+		# as unknown
+		name = ""
+		while i:
+			i, d = divmod(i - 1, 26)
+			name = chr(97 + d) + name
+		names.append("v" + name)
+	relops = list(RELOPS)
+
+	def expr():
+		text = rng.choice(names) if rng.random() < 0.5 else str(rng.randrange(1000))
+		for i in range(rng.randrange(max(1, width))):
+			text += " " + rng.choice("+-*/") + " "
+			text += rng.choice(names) if rng.random() < 0.5 else str(rng.randrange(1, 1000))
+		return text
+
+	def simple():
+		k = rng.random()
+		if k < 0.75:
+			return "{0} = {1};".format(rng.choice(names), expr())
+		elif k < 0.9:
+			return "write({0});".format(expr())
+		return "read({0});".format(rng.choice(names))
+
+	def statement(level, indent):
+		k = rng.random()
+		cond = "{0} {1} {2}".format(expr(), rng.choice(relops), expr())
+		if level >= depth or k < 0.6:
+			return indent + simple() + "\n"
+		elif k < 0.8:
+			body = "".join(statement(level + 1, indent + "\t") for i in range(rng.randint(1, 4)))
+			return "{0}while ({1}) {{\n{2}{0}}}\n".format(indent, cond, body)
+		elif k < 0.9:
+			return "{0}while ({1}) {2}\n".format(indent, cond, simple())
+		elif k < 0.95:
+			return "{0}if ({1}) {2} fi\n".format(indent, cond, simple())
+		return "{0}if ({1}) {2} else {3} fi\n".format(indent, cond, simple(), simple())
+
+	text = "$$\n$$\n\tinteger " + ", ".join(names) + ";\n"
+	written = len(text)
+	out.write(text)
+	while written < size:
+		text = statement(0, "\t")
+		written += len(text)
+		out.write(text)
+	out.write("$$\n")
+	return written + 3
+
+
+def scale(text):
+	# "64K", "10M", "1G" or plain bytes
+	units = {"K": 2**10, "M": 2**20, "G": 2**30}
+	if text[-1:].upper() in units:
+		return int(text[:-1]) * units[text[-1:].upper()]
+	return int(text)
+
+
+def benchmark(args):
+	# Time the three stages on a generated program and print the numbers
+	# as JSON: stage 1 lexes (teeing the tokens), stage 2 parses them with
+	# inline codegen, stage 3 parses again and writes the listing
+	import json, time, tracemalloc
+	opts = {"size": "1M", "seed": "0", "depth": "3", "expr": "4", "ids": "16", "repeat": "1", "peak": "1", "save": None}
+	for arg in args:
+		name, sep, value = arg[2:].partition("=")
+		if not arg.startswith("--") or name not in opts or not sep:
+			print_usage()
+			return 1
+		opts[name] = value
+	try:
+		size = scale(opts["size"])
+		seed, depth, width, ids, repeat, traced = [int(opts[k]) for k in ("seed", "depth", "expr", "ids", "repeat", "peak")]
+	except ValueError:
+		print("ARRRR: benchmark options take integers, --size also K/M/G")
+		return 1
+
+	# Generated into a private directory unless --save names a file
+	scratch = None
+	path = opts["save"]
+	if path is None:
+		import tempfile
+		scratch = tempfile.TemporaryDirectory()
+		path = os.path.join(scratch.name, "bench.rat")
+	with open(path, 'w') as f:
+		written = generate(f, size, seed, depth, width, ids)
+
+	def stages():
+		c = Compiler(path)
+		c.log = open(os.devnull, 'w')
+		c.tee = True
+		for c.stage in (1, 2, 3):
+			start = time.perf_counter()
+			c.target()
+			yield c, time.perf_counter() - start
+		c.log.close()
+
+	try:
+		best = [None] * 3
+		for r in range(max(1, repeat)):
+			for i, (c, seconds) in enumerate(stages()):
+				best[i] = seconds if best[i] == None else min(best[i], seconds)
+		tokens = len(c.source.tokens)
+		instructions = len(c.table)
+		lines = c.source.line
+
+		# Separate pass so tracing does not skew the timings; it is several
+		# times slower, --peak=0 skips it
+		peak = [None] * 3
+		if traced:
+			tracemalloc.start()
+			for i, (c, seconds) in enumerate(stages()):
+				peak[i] = tracemalloc.get_traced_memory()[1]
+				tracemalloc.reset_peak()
+			tracemalloc.stop()
+	finally:
+		if scratch is not None:
+			scratch.cleanup()
+
+	report = {
+		"version": version,
+		"python": sys.version.split()[0],
+		"program": {"seed": seed, "size": size, "depth": depth, "expr": width, "ids": ids,
+		            "bytes": written, "lines": lines, "tokens": tokens, "instructions": instructions},
+		"repeat": max(1, repeat),
+		"stages": {
+			"lexer": {"seconds": best[0], "tokens_per_sec": tokens / best[0], "bytes_per_sec": written / best[0], "peak_bytes": peak[0]},
+			"syntaxer": {"seconds": best[1], "tokens_per_sec": tokens / best[1], "peak_bytes": peak[1]},
+			"codegen": {"seconds": best[2], "instructions_per_sec": instructions / best[2], "peak_bytes": peak[2]},
+		},
+	}
+	try:
+		import resource
+		report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	except ImportError:
+		pass
+	print(json.dumps(report, indent=2))
+	return 0
+
+
+def lex_bench(args, jobs=None):
+	# Lex one generated program sequentially, then with tokenize_parallel()
+	# on 2, 4, ... up to jobs processes (default all cores), and print the
+	# times and speedups as JSON. Every parallel run must give the
+	# sequential tokens
+	import io, json, time
+	opts = {"size": "4M", "seed": "0", "repeat": "3"}
+	for arg in args:
+		name, sep, value = arg[2:].partition("=")
+		if not arg.startswith("--") or name not in opts or not sep:
+			print_usage()
+			return 1
+		opts[name] = value
+	try:
+		size = scale(opts["size"])
+		seed, repeat = int(opts["seed"]), max(1, int(opts["repeat"]))
+	except ValueError:
+		print("ARRRR: benchmark options take integers, --size also K/M/G")
+		return 1
+	jobs = jobs or os.cpu_count() or 1
+	counts = [1]
+	while counts[-1] < jobs:
+		counts.append(min(jobs, counts[-1] * 2))
+
+	out = io.StringIO()
+	written = generate(out, size, seed)
+	text = out.getvalue()
+
+	runs = []
+	for n in counts:
+		best = None
+		for r in range(repeat):
+			source = Source(text)
+			start = time.perf_counter()
+			tokens = tokenize_array(source) if n == 1 else tokenize_parallel(source, n)
+			seconds = time.perf_counter() - start
+			best = seconds if best == None else min(best, seconds)
+		if n == 1:
+			expected = tokens
+		elif any(getattr(tokens, column) != getattr(expected, column) for column in ("kind", "start", "end", "line")):
+			print("ARRRR: --jobs={0} lexed different tokens".format(n))
+			return 1
+		runs.append({"jobs": n, "seconds": best, "tokens_per_sec": len(tokens) / best,
+		             "speedup": runs[0]["seconds"] / best if runs else 1.0})
+
+	print(json.dumps({
+		"version": version,
+		"python": sys.version.split()[0],
+		"cpus": os.cpu_count(),
+		"program": {"seed": seed, "size": size, "bytes": written, "lines": source.line, "tokens": len(tokens)},
+		"repeat": repeat,
+		"runs": runs,
+	}, indent=2))
+	return 0
+
+
+def startup(args):
+	# Wall time of a no-op compile in a fresh interpreter (-a on an empty
+	# program, the way a build calls us), against the interpreter alone
+	# and a bare import. Fails when the compile costs more than --budget
+	# milliseconds on top of the interpreter
+	import subprocess, tempfile, time
+	opts = {"repeat": "20", "budget": "30"}
+	for arg in args:
+		name, sep, value = arg[2:].partition("=")
+		if not arg.startswith("--") or name not in opts or not sep:
+			print_usage()
+			return 1
+		opts[name] = value
+	try:
+		repeat, budget = max(1, int(opts["repeat"])), float(opts["budget"])
+	except ValueError:
+		print("ARRRR: --repeat takes an integer, --budget milliseconds")
+		return 1
+
+	home = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	env = dict(os.environ, PYTHONPATH=os.pathsep.join([home] + ([os.environ["PYTHONPATH"]] if os.environ.get("PYTHONPATH") else [])))
+	with tempfile.TemporaryDirectory() as tmp:
+		path = os.path.join(tmp, "empty.rat")
+		with open(path, 'w') as f:
+			f.write("$$\n$$\n$$\n")
+		commands = {
+			"interpreter": [sys.executable, "-c", "pass"],
+			"import": [sys.executable, "-c", "import pyrat"],
+			"compile": [sys.executable, "-m", "pyrat", "--assembly", path],
+		}
+		best = {}
+		for r in range(repeat):
+			for name, command in commands.items():
+				start = time.perf_counter()
+				subprocess.run(command, env=env, cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+				best[name] = min(best.get(name, float("inf")), (time.perf_counter() - start) * 1000)
+
+	cost = best["compile"] - best["interpreter"]
+	print("==> interpreter {0:.1f} ms, import {1:.1f} ms, no-op compile {2:.1f} ms (best of {3})".format(best["interpreter"], best["import"], best["compile"], repeat))
+	print("==> startup costs {0:.1f} ms, budget {1:g} ms: {2}".format(cost, budget, "ok" if cost <= budget else "OVER"))
+	return 0 if cost <= budget else 1
+
+
+def watch(args, optimize=False, format="text", recover=0):
+	# Keep a compiler warm and rebuild a file whenever it changes: the
+	# edit is lexed incrementally with relex(), then parsed again from
+	# the token stream. Polls the file's mtime and size; stop with ^C
+	import time
+	interval = 0.2
+	option = "--assembly"
+	path = None
+	for arg in args:
+		if arg.startswith("--interval="):
+			interval = float(arg[11:])
+		elif arg in ("--syntaxer", "-s", "--assembly", "-a", "--symbols", "-y"):
+			option = arg
+		elif path is None and os.path.isfile(arg):
+			path = arg
+		else:
+			print_usage()
+			return 1
+	if path is None:
+		print_usage()
+		return 1
+
+	c = Compiler(path)
+	c.optimize = optimize
+	c.format = format
+	c.recover = recover
+	source = None
+	stamp = None
+	try:
+		while True:
+			try:
+				st = os.stat(path)
+			except OSError:
+				time.sleep(interval)
+				continue
+			if (st.st_mtime_ns, st.st_size) != stamp:
+				stamp = (st.st_mtime_ns, st.st_size)
+				with open(path, 'r') as f:
+					text = f.read()
+				start = time.perf_counter()
+				if source is None:
+					source = Source(text)
+					source.tokens = tokenize_array(source)
+					source.complete = True
+					lexed = len(source.tokens)
+				elif text.lower() != source.text:
+					source, lexed = relex(source, text)
+				else:
+					time.sleep(interval)
+					continue
+				relexed = time.perf_counter()
+				c.source = source
+				code = 0
+				try:
+					run(c, option)
+				except SystemExit as e:
+					code = e.code if isinstance(e.code, int) else 1
+				c.flush()
+				c.status("==> lexed {0} of {1} tokens in {2:.1f} ms, compiled in {3:.1f} ms (exit {4})".format(lexed, len(source.tokens), (relexed - start) * 1000, (time.perf_counter() - relexed) * 1000, code))
+				sys.stdout.flush()
+			time.sleep(interval)
+	except KeyboardInterrupt:
+		return 0
+
+
+def main(argv=None):
+	if argv == None:
+		argv = sys.argv
+
+	# -O, --ssa, --format, --profile, --recover, --jobs and the cache
+	# options may go anywhere on the command line
+	cache = None
+	limit = cache_limit
+	stats = False
+	optimize = False
+	ssa = False
+	strip = False
+	format = "text"
+	profile = None
+	recover = 0
+	jobs = None
+	args = [argv[0]]
+	for arg in argv[1:]:
+		if arg == "-O":
+			optimize = True
+		elif arg == "--ssa":
+			ssa = True
+		elif arg == "--strip":
+			strip = True
+		elif arg == "--recover":
+			recover = recover_limit
+		elif arg.startswith("--recover="):
+			try:
+				recover = int(arg[10:])
+			except ValueError:
+				recover = 0
+			if recover < 1:
+				print("ARRRR: --recover takes a number of errors")
+				exit(1)
+		elif arg.startswith("--jobs="):
+			try:
+				jobs = int(arg[7:])
+			except ValueError:
+				jobs = 0
+			if jobs < 1:
+				print("ARRRR: --jobs takes a number of processes")
+				exit(1)
+		elif arg == "--profile":
+			profile = ""
+		elif arg.startswith("--profile="):
+			profile = arg[10:]
+		elif arg.startswith("--format="):
+			format = arg[9:]
+			if format not in FORMATS:
+				print("ARRRR: --format takes text, tsv or ndjson")
+				exit(1)
+		elif arg.startswith("--cache="):
+			cache = arg[8:]
+		elif arg.startswith("--cache-size="):
+			try:
+				limit = int(arg[13:]) * 2**20
+			except ValueError:
+				print("ARRRR: --cache-size takes a size in MB")
+				exit(1)
+		elif arg == "--cache-stats":
+			stats = True
+		else:
+			args.append(arg)
+	argv = args
+	pool = ["--jobs={0}".format(jobs)] if jobs else []
+	if cache != None:
+		from .cache import CompileCache
+
+	if stats and cache == None:
+		print_usage()
+		exit(1)
+	elif stats and len(argv) == 1:
+		CompileCache(cache, limit).report()
+		exit(0)
+
+	if len(argv) > 1 and argv[1] == "--bench":
+		exit(benchmark(argv[2:]))
+
+	if len(argv) > 1 and argv[1] == "--lex-bench":
+		exit(lex_bench(argv[2:], jobs))
+
+	if len(argv) > 1 and argv[1] == "--startup":
+		exit(startup(argv[2:]))
+
+	if len(argv) > 1 and argv[1] == "--watch":
+		exit(watch(argv[2:], optimize, format, recover))
+
+	if len(argv) > 1 and argv[1] == "--golden":
+		exit(golden(argv[2:] + pool))
+
+	if len(argv) > 1 and argv[1] == "--batch":
+		code = batch(argv[2:] + pool, None if cache == None else (cache, limit), optimize, format, recover)
+		if stats:
+			CompileCache(cache, limit).report()
+		exit(code)
+
+	c = Compiler()
+	c.optimize = optimize
+	c.ssa = ssa
+	c.strip = strip
+	c.format = format
+	c.recover = recover
+	c.jobs = jobs or 1
+	if cache != None:
+		c.cache = CompileCache(cache, limit)
+
+	# Sanity checks
+	option = "all"
+	if len(argv) == 3:
+		option = argv[1]
+		c.filename = argv[2]
+	elif len(argv) == 2:
+		c.filename = argv[1]
+	else:
+		print_usage()
+		exit(1)
+
+	# Check file exists
+	if option.startswith(("-t", "-r", "-m", "--test", "--rules", "--memory")) and len(argv) > 2:
+		print_usage()
+		exit(1)
+
+	if c.filename == "--test" or c.filename == "-t":
+		c.filename = None
+		option = "--test"
+	elif c.filename == "--rules" or c.filename == "-r":
+		c.filename = None
+		option = "--rules"
+	elif c.filename == "--memory" or c.filename == "-m":
+		c.filename = None
+		option = "--memory"
+	elif c.filename == "--vm-bench":
+		c.filename = None
+		option = "--vm-bench"
+	elif c.filename == "-h" or c.filename == "--help":
+		print_usage()
+		exit(1)
+	elif not os.path.isfile(c.filename):
+		print("ARRRR: Argument must be a valid file name")
+		exit(2)
+	elif c.filename.endswith(".ratc") != (option == "--disasm") and option not in ("-a", "--assembly", "--run", "-y", "--symbols", "--ir"):
+		print("ARRRR: .ratc files are for --disasm, -a, --run, -y and --ir only")
+		exit(1)
+
+	# Write to file
+	if c.logfile:
+		try:
+			c.log = open(c.output, 'w')
+		except ValueError: "cannot write file"
+
+	# Run, under the profiler when asked
+	profiler = None
+	if profile != None:
+		c.profile = Profile()
+		if profile:
+			import cProfile
+			profiler = cProfile.Profile()
+			profiler.enable()
+	try:
+		run(c, option)
+	finally:
+		if profiler:
+			profiler.disable()
+			with open(profile, 'w') as f:
+				for line in collapse(profiler):
+					f.write(line + "\n")
+		c.flush()
+		if c.log:
+			c.log.close()
+		if c.profile:
+			c.profile.report(sys.stderr)
+
+	if c.cache != None:
+		c.cache.evict()
+		if stats:
+			c.cache.report()
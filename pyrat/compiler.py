@@ -0,0 +1,1734 @@
+# The compiler: parser, code generation, listings and the VM
+
+import os, sys
+from array import array
+from collections import namedtuple
+
+from .assembly import ADD, ADDF, BINARY, CALL, DIV, DIVF, EQU, FTOI, Function, GRT, INLINE_LIMIT, ITOF, InstrBuffer, JUMP, JUMPZ, LABEL, LES, \
+	LineTable, MUL, NEQ, NEQF, POPM, POPMF, POPS, POPSF, PUSHC, PUSHI, PUSHM, PUSHMF, PUSHS, PUSHSF, QUALIFIERS, RELOPS, RET, SUB, SymbolTable, \
+	coerce, is_real, peephole, reduce_expr, underflow
+from .defaults import call_limit, fixture_dir, output
+from .lexer import Source, TokenArray, fsm, get_token, open_source, tokenize_array, tokenize_parallel
+from .listing import FORMATS, Sink, TextRows
+from .trace import FACTOR_RULES, OPERATOR_RULES, QUALIFIER_RULES, R_ASSIGN, R_ASSIGN_STATEMENT, R_BODY, R_COMPOUND_STATEMENT, R_DECLARATION_LIST, \
+	R_DECLARATION_LISTS, R_DECLARE_BOOLEAN, R_DECLARE_INTEGER, R_DECLARE_REAL, R_ELSE_STATEMENT, R_EXPRESSION, R_EXPRESSION_EMPTY, R_FACTOR_CALL, \
+	R_FACTOR_IDENTIFIER, R_FACTOR_INTEGER, R_FACTOR_PAREN, R_FACTOR_REAL, R_FUNCTION, R_IDS, R_IF_STATEMENT, R_OPT_DECLARATIONS, R_OPT_FUNCTIONS, \
+	R_PARAMETER, R_RAT15SU, R_READ, R_READ_STATEMENT, R_RETURN, R_RETURN_STATEMENT, R_RETURN_VALUE, R_STATEMENT_LIST, R_TERM, R_TERM_EMPTY, \
+	R_WHILE_STATEMENT, R_WRITE_STATEMENT, RowListener, RuleListener
+
+
+def read_input(stream):
+	# Whitespace separated integers for PUSHS
+	for line in stream:
+		for word in line.split():
+			yield word
+
+
+# Modes whose output can be rebuilt from a cached unit, and the last
+# stage each one runs
+CACHE_MODES = {"all": 3, "--lexer": 1, "--assembly": 3, "--run": 3, "--symbols": 3, "--annotate": 3}
+
+
+# Syntax errors: exit code 10 (expected vs given) or 11 (EOF)
+Diagnostic = namedtuple("Diagnostic", "line code expected token lexeme")
+# Where --recover picks up parsing after an error
+SYNC = frozenset([";", "}", "fi", "$$"])
+
+
+class Panic(Exception):
+	# Raised by print_error() under --recover with the offending token
+	pass
+
+
+# Golden tests: the row kinds each unit test mode checks
+GOLDEN = {"--test": ("tokens",), "--rules": ("rules",), "--memory": ("asm", "symbols", "constants"), "-O": ("opt",), "--ssa": ("ssa",), "--run": ("output",)}
+fixtures = {}
+
+
+def load_fixtures():
+	# Unit test cases from the fixture directory, read on first use.
+	# unitN.rat is the source and unitN.input what it reads, unitN.rules
+	# and .output one rule or written value per line, and unitN.tokens,
+	# .asm, .symbols and .constants tab separated rows, .opt and .ssa the
+	# listing after the peephole optimizer or the SSA round trip
+	if not fixtures:
+		for name in sorted(os.listdir(fixture_dir)):
+			base, ext = os.path.splitext(name)
+			if not base.startswith("unit") or not base[4:].isdigit():
+				continue
+			with open(os.path.join(fixture_dir, name), 'r') as f:
+				text = f.read()
+			case = fixtures.setdefault(int(base[4:]), {})
+			if ext == ".rat" or ext == ".input":
+				case[ext[1:]] = text
+			elif ext == ".rules" or ext == ".output":
+				case[ext[1:]] = text.split("\n")[:-1]
+			else:
+				case[ext[1:]] = [tuple(row.split("\t")) for row in text.split("\n")[:-1]]
+	return fixtures
+
+
+def golden_units(mode):
+	# Fixture units with expected rows for one of the GOLDEN modes
+	return [n for n, case in sorted(load_fixtures().items()) if any(kind in case for kind in GOLDEN[mode])]
+
+
+def save_fixture(n, kind, rows):
+	# Write the rows of one kind back in the load_fixtures() layout
+	with open(os.path.join(fixture_dir, "unit{0}.{1}".format(n, kind)), 'w') as f:
+		for row in rows:
+			f.write((row if kind == "rules" or kind == "output" else "\t".join(row)) + "\n")
+
+
+class Compiler:
+	# All state of one compilation; independent instances can run side by
+	# side in one process
+	def __init__(self, filename=None):
+		self.filename = filename
+		self.output = output
+		self.log = None
+
+		# Flags
+		self.debug = False
+		self.test = False
+		self.rules = False
+		self.memory = False
+		self.logfile = True
+		self.verbose = False
+		self.tee = False
+		self.symtab = False
+		self.run = False
+		self.optimize = False
+		self.ssa = False
+		self.ir = False
+		self.annotate = False
+		self.object = False
+		self.strip = False
+		self.format = "text"
+		self.profile = None
+		self.mode = None
+		self.cache = None
+		self.update = False
+		self.recover = 0
+		self.jobs = 1
+
+		# State
+		self.fail = []
+		self.jump = []
+		self.table = InstrBuffer()
+		self.symbols = SymbolTable()
+		# Source positions: the table, the Source being parsed, the line
+		# and offset where the current statement starts, the token end the
+		# last run in the table was made at (None after self.at changes)
+		# and the line bounds of self.at
+		self.lines = LineTable()
+		self.src = None
+		self.at = (1, 0)
+		self.marked = None
+		self.bounds = (0, 0, 0)
+		self.count = 0
+		self.icount = 0
+		self.errors = 0
+		self.index = 1
+		self.num = 1
+		self.stage = 0
+		self.unit = 0
+		self.pos = 0
+		self.save = None
+		self.saveType = None
+		self.ahead = False
+		self.source = None
+		self.key = None
+		self.hit = None
+		self.loaded = None
+		self.removed = 0
+		self.sink = None
+		self.style = None
+		self.listeners = []
+		self.trace = []
+		# Program text to compile instead of reading filename
+		self.text = None
+		self.actual = {}
+		self.diagnostics = []
+		self.functions = {}
+		self.current = None
+		self.inlined = 0
+
+	def route(self):
+		# Rows go to the log file or stdout through a buffering sink, in
+		# the row style of the chosen --format
+		self.flush()
+		self.sink = Sink(self.log if self.logfile else sys.stdout)
+		if self.format != "text":
+			self.style = FORMATS[self.format]()
+		else:
+			self.style = TextRows(not self.logfile)
+
+	def flush(self):
+		# Call before printing directly, so rows keep their order
+		if self.sink is not None:
+			self.sink.flush()
+
+	def status(self, text):
+		# Progress lines stay off stdout when it carries --format rows
+		self.flush()
+		print(text, file=sys.stderr if self.run or self.format != "text" else sys.stdout)
+
+	def print_token(self, token, lexeme):
+		if self.stage == 1 and self.verbose:
+			self.sink.write(self.style.token(token, lexeme, self.num))
+
+	def banner(self):
+		if self.verbose:
+			if self.sink is None:
+				self.route()
+			self.sink.write(self.style.banner)
+			self.flush()
+
+	def print_row(self, col1, col2, col3=""):
+		if self.memory:
+			self.errors = self.compare_asm(self.count, col1, col2, col3, self.unit)
+			self.count += 1
+		else:
+			self.sink.write(self.style.row(col1, col2, col3))
+
+	def print_legend(self, col1, col2, col3=""):
+		if self.memory:
+			self.errors = self.compare_mem(self.icount, col1, col2, col3, self.unit)
+			self.icount += 1
+		else:
+			self.sink.write(self.style.legend(col1, col2, col3))
+
+	def listen(self, listener):
+		# Register a Listener for the rule and token events of every parse
+		self.listeners.append(listener)
+
+	def print_rule(self, rule):
+		# rule is an id from trace.py; callers check self.trace first
+		for listener in self.trace:
+			listener.rule(rule, self.num)
+
+	def print_error(self, expected, token, lexeme):
+		self.flush()
+		error = Diagnostic(self.num, 10, expected, token, lexeme)
+		if self.recover and not self.rules:
+			# Panic mode: note it and unwind to the statement list
+			self.diagnostics.append(error)
+			if len(self.diagnostics) >= self.recover:
+				self.report_errors()
+			raise Panic(token, lexeme)
+		self.show_error(error)
+		if not self.rules:
+			self.dump_exit(10)
+
+	def print_exit(self, text):
+		self.flush()
+		error = Diagnostic(self.num, 11, text, None, None)
+		if self.recover:
+			self.diagnostics.append(error)
+			self.report_errors(11)
+		self.show_error(error)
+		self.dump_exit(11)
+
+	def show_error(self, error):
+		line, code, expected, token, lexeme = error
+		if code == 11:
+			if self.logfile:
+				print("Syntax Error: {0}, line {1}\n".format(expected, line))
+			else:
+				print("\033[1;31m  Syntax Error:\033[0m \033[1m{0}\033[0m, line {1}".format(expected, line))
+		elif self.logfile:
+			try:
+				print("Syntax Error: expected {0} but {1} `{2}` given, line {3}\n".format(expected, token, lexeme, line))
+			except TypeError: "blank"
+		else:
+			try:
+				print("\033[1;31m  Syntax Error:\033[0m expected \033[1m{0}\033[0m but \033[1m{1}\033[0m `{2}` given, line {3}".format(expected, token, lexeme, line))
+			except TypeError: "blank"
+
+	def report_errors(self, code=10):
+		# All the diagnostics of a --recover parse, then the usual exit
+		for error in self.diagnostics:
+			self.show_error(error)
+		capped = " (stopped at --recover={0})".format(self.recover) if len(self.diagnostics) >= self.recover else ""
+		self.status("==> {0} syntax errors{1}".format(len(self.diagnostics), capped))
+		self.dump_exit(code)
+
+	def synchronize(self, f, token, lexeme):
+		# Panic mode: skip to the next ; } fi or $$. The caller consumes a
+		# ; or fi, which end the broken statement, and keeps } and $$
+		while lexeme not in SYNC and lexeme != None:
+			token, lexeme = self.get_lex(f)
+		return token, lexeme
+
+	def target(self, n=1):
+		self.route()
+		self.trace = list(self.listeners)
+		if self.rules:
+			self.trace.insert(0, RuleListener(self))
+		elif self.verbose:
+			self.trace.insert(0, RowListener(self))
+		if self.profile:
+			self.trace.append(self.profile)
+		phase = ("lexer", "syntaxer", "codegen")[self.stage - 1]
+		if self.profile:
+			self.profile.begin()
+		try:
+			if self.stage > 1 and self.source is not None:
+				# Parse the tokens cached by the stage 1 pass
+				f = self.source
+				f.cursor = 0
+			elif self.stage == 3 and self.text is None and self.filename.endswith(".ratc"):
+				# A compiled object, nothing to lex or parse
+				f = None
+				self.load_object()
+			else:
+				f = None
+				self.loaded = None
+				if self.cache is not None and self.mode in CACHE_MODES:
+					if self.text is not None:
+						data = self.text.encode()
+					else:
+						with open(self.filename, 'rb') as raw:
+							data = raw.read()
+					self.key = self.cache.key(data, self.mode + (" -O" if self.optimize else "") + (" --ssa" if self.ssa else ""))
+					self.hit = self.cache.load(self.key)
+					if self.hit is not None:
+						f = self.load_source(self.hit)
+				if f is None:
+					f = Source(self.text) if self.text is not None else open_source(self.filename)
+					f.trace = self.debug
+					if self.jobs > 1 and not self.debug:
+						# Lexed up front across processes, replayed by lexer()
+						f.tokens = tokenize_parallel(f, self.jobs)
+						f.complete = True
+					elif self.profile and self.stage > 1 and not self.debug:
+						# Lexed up front too, or the parse pulling tokens one
+						# at a time would hide the lexer inside its own lap
+						f.tokens = tokenize_array(f)
+						f.complete = True
+					elif self.tee or self.key is not None or self.profile:
+						f.tokens = TokenArray(f.text)
+					if self.profile and f.complete:
+						self.profile.lap("lexer")
+				if f.tokens is not None:
+					self.source = f
+
+			del self.jump[:]
+			del self.diagnostics[:]
+			self.functions = {}
+			self.current = None
+			self.inlined = 0
+			self.ahead = False
+			self.table.clear()
+			self.symbols.clear()
+			self.lines.clear()
+			self.src = f
+			self.at = (1, 0)
+			self.marked = None
+			self.bounds = (0, 0, 0)
+			self.count = 0
+			self.errors = 0
+			self.icount = 0
+			self.pos = 0
+			self.index = 1
+			self.num = 1
+
+			if self.stage == 1:
+				if self.debug:
+					print("#", "\t", "TOKEN", "\t\t", "LEXEME")
+				elif not self.test and not self.logfile:
+					self.sink.write(self.style.lexer)
+				self.lexer(f, n)
+				if self.key is not None and self.hit is None and CACHE_MODES[self.mode] == 1:
+					self.save_unit(f)
+
+			elif self.stage == 2:
+				self.parse(f)
+
+			elif self.stage == 3:
+				if self.hit is not None:
+					# Cache hit, nothing to parse
+					self.load_unit(self.hit)
+				elif self.loaded is not None:
+					self.table, self.symbols, self.lines = self.loaded
+					if self.optimize:
+						# An object built without -O, or nothing to remove
+						self.table, self.removed, self.lines = peephole(self.table, self.lines)
+					self.index = len(self.table) + 1
+				else:
+					self.parse(f)
+					self.lines.close(len(self.table))
+					if self.ssa:
+						self.lower_ir(self.build_ir())
+					if self.optimize:
+						self.table, self.removed, self.lines = peephole(self.table, self.lines)
+						self.index = len(self.table) + 1
+					if self.key is not None:
+						self.save_unit(f)
+				if self.optimize:
+					self.status("==> peephole removed {0} instructions ({1} -> {2})".format(self.removed, len(self.table) + self.removed, len(self.table)))
+				if self.profile:
+					self.profile.lap(phase)
+					phase = "execute" if self.run else "listing"
+				# Output
+				if self.symtab:
+					self.dump_references()
+				elif self.run and self.memory:
+					self.compare_output(n)
+				elif self.run:
+					self.execute(self.table)
+				elif self.ir:
+					ir = self.build_ir()
+					for line in ir.dump():
+						self.sink.write(line + "\n")
+					self.status("==> {0} blocks, {1} registers, no problems".format(len(ir.blocks), ir.registers))
+				elif self.annotate:
+					self.sink.write(self.style.listing)
+					self.dump_annotated()
+				elif self.object:
+					self.write_object()
+				else:
+					self.banner()
+					self.sink.write(self.style.listing)
+					self.dump_table()
+					self.sink.write(self.style.symbols)
+					self.dump_symbols()
+					if self.symbols.constants:
+						self.sink.write(self.style.constants)
+						self.dump_constants()
+
+				if self.errors > 0:
+					self.flush()
+					print("ARRRR: Unit test", n, "failed")
+					self.fail.append(n)
+
+		except ValueError: "cannot read file"
+		finally:
+			self.flush()
+			if self.profile:
+				self.profile.lap(phase)
+				self.profile.tally(self)
+
+	def save_unit(self, f):
+		# Cache what target() produced: token stream, instruction table
+		# and symbol table, as plain types for marshal
+		while not f.complete:
+			self.lexer(f)
+		self.cache.store(self.key, {
+			"text": f.text,
+			"lines": f.line,
+			"tokens": [f.tokens.kind.tobytes(), f.tokens.start.tobytes(), f.tokens.end.tobytes(), f.tokens.line.tobytes()],
+			"table": [self.table.op.tobytes(), self.table.oprnd.tobytes(), self.table.flags.tobytes(), self.table.strings],
+			"symbols": [self.symbols.ids, self.symbols.types, self.symbols.refs, self.symbols.next, self.symbols.constants],
+			"map": self.lines.encode(),
+			"removed": self.removed,
+		})
+
+	def load_source(self, unit):
+		tokens = TokenArray(unit["text"])
+		for column, data in zip((tokens.kind, tokens.start, tokens.end, tokens.line), unit["tokens"]):
+			column.frombytes(data)
+		f = Source(unit["text"], tokens)
+		f.line = unit["lines"]
+		return f
+
+	def load_unit(self, unit):
+		op, oprnd, flags, self.table.strings = unit["table"]
+		self.table.op.frombytes(op)
+		self.table.oprnd.frombytes(oprnd)
+		self.table.flags.frombytes(flags)
+		self.symbols.ids, self.symbols.types, self.symbols.refs, self.symbols.next, self.symbols.constants = unit["symbols"]
+		self.lines = LineTable.decode(unit["map"])
+		self.removed = unit["removed"]
+		self.index = len(self.table) + 1
+
+	def load_object(self):
+		from .ratc import load_object
+		try:
+			self.loaded = load_object(self.filename)
+		except ValueError as e:
+			self.flush()
+			print("ARRRR: {0}: {1}".format(self.filename, e))
+			exit(2)
+
+	def write_object(self):
+		# Next to the source, without the line table for --strip
+		from .ratc import SUFFIX, write_object
+		path = os.path.splitext(self.filename)[0] + SUFFIX
+		size = write_object(path, self.table, self.symbols, None if self.strip else self.lines)
+		self.status("==> wrote {0}: {1} instructions, {2} bytes".format(path, len(self.table), size))
+
+	def pipeline(self):
+		# Lexer log and compilation from a single lexing pass
+		self.tee = True
+		self.status("==> running lexer")
+		self.stage = 1
+		self.target()
+		self.banner()
+		self.status("==> running compiler")
+		self.stage = 3
+		self.target()
+
+	def parse(self, f):
+		try:
+			# <Rat15su>
+			token, lexeme = self.marker(f)
+			# <Opt Function Definitions>
+			token, lexeme = self.opt_func_defs(f)
+			# <Opt Declaration List> <Statement List>
+			token, lexeme = self.opt_dec_list(f, token, lexeme)
+			# End
+			token, lexeme = self.marker(f)
+		except Panic: "outside any statement list, nothing to resume"
+		if self.diagnostics:
+			self.report_errors()
+
+	def get_lex(self, f):
+		token = None
+		lexeme = None
+		try:
+			token, lexeme = self.lexer(f)
+		except TypeError: "EOF"
+		self.checkrat(f, token, lexeme)
+		# Nothing at EOF
+		if self.trace and token != None:
+			for listener in self.trace:
+				listener.token(token, lexeme, self.num)
+
+		return token, lexeme
+
+	def marker(self, f):
+		token, lexeme = self.get_lex(f)
+		if lexeme == None:
+			pass
+		elif lexeme != "$$":
+			self.print_error("$$", token, lexeme)
+		return token, lexeme
+
+	def checkrat(self, f, token, lexeme):
+		if lexeme == None:
+			if self.pos < 3:
+				self.print_exit("unexpected EOF")
+			elif self.pos > 3:
+				self.print_exit("end of file")
+		elif lexeme == "$$":
+			if self.pos == 0:
+				if self.trace: self.print_rule(R_RAT15SU)
+			elif self.pos > 2:
+				self.print_error("end of file", token, lexeme)
+			self.pos += 1
+		elif self.pos > 2:
+			self.print_error("end of file", token, lexeme)
+
+	def build_ir(self):
+		# The instruction table as SSA, checked. Anything wrong here is a
+		# compiler bug, not a problem with the program
+		from .ir import lift, validate
+		try:
+			ir = lift(self.table)
+			problems = validate(ir)
+		except ValueError as e:
+			problems = [str(e)]
+		if problems:
+			self.flush()
+			for problem in problems:
+				print("ARRRR: IR:", problem)
+			exit(13)
+		return ir
+
+	def lower_ir(self, ir):
+		# Common subexpressions out, then back to the instruction table;
+		# temporaries go after the symbols
+		from .ir import cse, lower
+		removed = cse(ir)
+		self.table, cells, origins = lower(ir, self.symbols.next)
+		self.lines = self.lines.remap(origins)
+		for qualifier in cells:
+			self.symbols.temporary(qualifier)
+		self.index = len(self.table) + 1
+		self.status("==> ssa: {0} blocks, {1} registers, {2} instructions removed, {3} in memory".format(len(ir.blocks), ir.registers, removed, len(cells)))
+
+	def gen_instr(self, op, oprnd):
+		self.table.append(op, oprnd)
+		if self.src.end != self.marked:
+			self.mark_line()
+		self.index += 1
+
+	def mark_line(self):
+		# Position of the instructions from here on: the current statement,
+		# from its first token to the end of the last token read, cut at
+		# the end of the line it starts on
+		line, start = self.at
+		f = self.src
+		if self.bounds[0] != line:
+			end = f.text.find("\n", start)
+			self.bounds = (line, f.text.rfind("\n", 0, start) + 1, end if end >= 0 else f.size)
+		line, begin, end = self.bounds
+		self.lines.mark(self.index, line, start - begin + 1, max(min(f.end, end), start + 1) - begin)
+		self.marked = f.end
+
+	def get_address(self, token, lexeme):
+		return self.symbols.address(token, lexeme)
+
+	def declare(self, token, lexeme, qualifier):
+		# Once per scope, or again with the same type: code already made
+		# for the name must not change meaning
+		addr = self.symbols.lookup(lexeme, True)
+		if addr != None and self.symbols.type(addr) != qualifier:
+			self.print_error("{0} to stay {1}".format(lexeme, self.symbols.type(addr)), token, lexeme)
+		return self.symbols.declare(lexeme, qualifier)
+
+	def dump_exit(self, n):
+		if self.stage > 2:
+			self.dump_table()
+			self.dump_symbols()
+			self.dump_constants()
+		exit(n)
+
+	def dump_table(self):
+		if len(self.table) > 0:
+			for row in self.table.rows():
+				if row[2] == None:
+					self.print_row(row[0], row[1])
+				else:
+					self.print_row(row[0], row[1], row[2])
+
+	def dump_annotated(self):
+		# Each source line followed by the instructions it generated. A
+		# line shown before (the closing jump of a loop) is shown again
+		if self.text is not None:
+			text = self.text
+		else:
+			with open(self.filename, 'r') as f:
+				text = f.read()
+		source = text.split("\n")
+		if source[-1] == "":
+			source.pop()
+		runs = self.lines.runs()
+		run = next(runs, None)
+		shown = 0
+		line = None
+		for addr, op, oprnd in self.table.rows():
+			while run is not None and run[1] < addr:
+				run = next(runs, None)
+			if run is not None and run[0] <= addr and run[2] != line:
+				line = run[2]
+				for n in range(shown + 1, line + 1) if line > shown else [line]:
+					self.sink.write(self.style.source(n, source[n-1] if n <= len(source) else ""))
+				shown = max(shown, line)
+			if oprnd == None:
+				self.print_row(addr, op)
+			else:
+				self.print_row(addr, op, oprnd)
+		for n in range(shown + 1, len(source) + 1):
+			self.sink.write(self.style.source(n, source[n-1]))
+
+	def dump_symbols(self):
+		self.icount = len(self.symbols.ids)-1
+		for lexeme, addr in self.symbols.ids.items():
+			self.print_legend(lexeme, addr, self.symbols.type(addr))
+
+	def dump_constants(self):
+		for index, value in enumerate(self.symbols.constants):
+			if self.memory:
+				self.errors = self.compare_const(index, value, index, "real", self.unit)
+			else:
+				self.sink.write(self.style.constant(value, index, "real"))
+
+	def dump_references(self):
+		self.sink.write(self.style.references)
+		for lexeme, addr, refs in self.symbols.references():
+			self.sink.write(self.style.reference(lexeme, addr, refs))
+
+	def execute(self, program, stdin=None, stdout=None):
+		# Stack machine for the generated assembly. Operands are decoded
+		# once into flat lists, checked for stack underflow, and the operand
+		# stack is preallocated (it can never hold more values than the
+		# program has push instructions, unless it recurses). Memory is two
+		# typed regions, 64-bit integers (booleans too) and doubles, each
+		# variable at its slot in the region of its type. Python arithmetic
+		# serves both types, so real operations decode to the integer ones
+		# except for DIVF and the conversions. Returns the number of
+		# instructions executed
+		self.flush()
+		size = len(program)
+		ops = list(program.op)
+		args = [0] * (size + 1)
+		slots = []
+		count = {"integer": 0, "real": 0}
+		for addr in range(self.symbols.base, self.symbols.next):
+			kind = "real" if self.symbols.type(addr) == "real" else "integer"
+			slots.append(count[kind])
+			count[kind] += 1
+		for addr in range(1, size + 1):
+			op = ops[addr-1]
+			oprnd = program.operand(addr)
+			if op == PUSHM or op == POPM or op == PUSHMF or op == POPMF:
+				args[addr-1] = slots[oprnd - self.symbols.base]
+			elif op == JUMP or op == JUMPZ or op == CALL:
+				args[addr-1] = oprnd - 1 if oprnd != None else size
+			elif op == PUSHI:
+				args[addr-1] = 1 if oprnd == "true" else 0 if oprnd == "false" else int(oprnd)
+			elif op == PUSHC:
+				ops[addr-1] = PUSHI
+				args[addr-1] = self.symbols.constants[oprnd]
+			elif ADDF <= op <= NEQF and op != DIVF:
+				ops[addr-1] = op - ADDF + ADD
+		ops.append(LABEL)
+		# Checked once here so the loop below need not watch sp: a negative
+		# index would quietly read the far end of the stack
+		addr = underflow(ops[:size], args)
+		if addr is not None:
+			self.runtime_error("stack underflow", program, addr)
+
+		memory = array('q', bytes(8 * count["integer"]))
+		reals = array('d', bytes(8 * count["real"]))
+		stack = [0] * (size + 1 + (call_limit if CALL in ops else 0))
+		calls = []
+		words = read_input(stdin or sys.stdin)
+		write = (stdout or sys.stdout).write
+		sp = 0
+		pc = 0
+		steps = 0
+
+		try:
+			while pc < size:
+				op = ops[pc]
+				steps += 1
+				if op == PUSHM:
+					stack[sp] = memory[args[pc]]
+					sp += 1
+				elif op == PUSHI:
+					stack[sp] = args[pc]
+					sp += 1
+				elif op == POPM:
+					sp -= 1
+					memory[args[pc]] = stack[sp]
+				elif op == ADD:
+					sp -= 1
+					stack[sp-1] += stack[sp]
+				elif op == SUB:
+					sp -= 1
+					stack[sp-1] -= stack[sp]
+				elif op == JUMPZ:
+					sp -= 1
+					if not stack[sp]:
+						pc = args[pc]
+						continue
+				elif op == JUMP:
+					pc = args[pc]
+					continue
+				elif op == LES:
+					sp -= 1
+					stack[sp-1] = 1 if stack[sp-1] < stack[sp] else 0
+				elif op == GRT:
+					sp -= 1
+					stack[sp-1] = 1 if stack[sp-1] > stack[sp] else 0
+				elif op == EQU:
+					sp -= 1
+					stack[sp-1] = 1 if stack[sp-1] == stack[sp] else 0
+				elif op == NEQ:
+					sp -= 1
+					stack[sp-1] = 1 if stack[sp-1] != stack[sp] else 0
+				elif op == MUL:
+					sp -= 1
+					stack[sp-1] *= stack[sp]
+				elif op == DIV:
+					sp -= 1
+					a = stack[sp-1]
+					b = stack[sp]
+					q = abs(a) // abs(b)
+					stack[sp-1] = q if (a < 0) == (b < 0) else -q
+				elif op == PUSHS:
+					stack[sp] = int(next(words))
+					sp += 1
+				elif op == POPS:
+					sp -= 1
+					write(str(stack[sp]) + "\n")
+				elif op == CALL:
+					if len(calls) == call_limit:
+						raise IndexError
+					calls.append(pc + 1)
+					pc = args[pc]
+					continue
+				elif op == RET:
+					# From the main program it ends the run
+					if not calls:
+						break
+					pc = calls.pop()
+					continue
+				elif op == PUSHMF:
+					stack[sp] = reals[args[pc]]
+					sp += 1
+				elif op == POPMF:
+					sp -= 1
+					reals[args[pc]] = stack[sp]
+				elif op == DIVF:
+					sp -= 1
+					stack[sp-1] /= stack[sp]
+				elif op == ITOF:
+					stack[sp-1] = float(stack[sp-1])
+				elif op == FTOI:
+					stack[sp-1] = int(stack[sp-1])
+				elif op == PUSHSF:
+					stack[sp] = float(next(words))
+					sp += 1
+				elif op == POPSF:
+					sp -= 1
+					write(repr(stack[sp]) + "\n")
+				pc += 1
+		except ZeroDivisionError:
+			self.runtime_error("division by zero", program, pc + 1)
+		except OverflowError:
+			self.runtime_error("integer overflow", program, pc + 1)
+		except (StopIteration, ValueError):
+			self.runtime_error("{0} input expected".format("real" if ops[pc] == PUSHSF else "integer"), program, pc + 1)
+		except IndexError:
+			self.runtime_error("stack overflow", program, pc + 1)
+
+		return steps
+
+	def runtime_error(self, text, program, addr):
+		# With the source line when the line table is the program's
+		where = self.lines.find(addr) if program is self.table else None
+		print("ARRRR: Runtime error: {0}, address {1}".format(text, addr) + (", line {0}".format(where[0]) if where else ""))
+		exit(12)
+
+	def vm_benchmark(self, iterations=200000):
+		# Instructions per second on a counting loop, compiled silently by
+		# a stage 2 pass
+		import io, time
+		testcase = """
+$$
+$$
+	integer i, n, sum;
+	i = 0;
+	sum = 0;
+	read(n);
+	while (i < n) {
+		sum = sum + i;
+		i = i + 1; }
+	write(sum);
+$$
+"""
+		self.text = testcase
+		self.target()
+		start = time.perf_counter()
+		steps = self.execute(self.table, [str(iterations)], io.StringIO())
+		elapsed = time.perf_counter() - start
+		print("==> executed {0} instructions in {1:.3f}s, {2:,.0f} instructions/s".format(steps, elapsed, steps / elapsed))
+
+	def opt_func_defs(self, f):
+		# The main program starts after the functions, jumped over
+		token, lexeme = self.get_lex(f)
+		if lexeme == "function":
+			if self.trace: self.print_rule(R_OPT_FUNCTIONS)
+			self.at = (self.num, f.start)
+			self.marked = None
+			addr = self.index
+			self.gen_instr(JUMP, None)
+			while lexeme == "function":
+				token, lexeme = self.function(f, token, lexeme)
+			self.table.patch(addr, self.index)
+		if lexeme == None:
+			pass
+		elif lexeme != "$$":
+			self.print_error("$$", token, lexeme)
+		return token, lexeme
+
+	def function(self, f, token, lexeme):
+		if self.trace: self.print_rule(R_FUNCTION)
+		token, lexeme = self.get_lex(f)
+		if token != "identifier":
+			self.print_error("identifier", token, lexeme)
+		name = lexeme
+		token, lexeme = self.get_lex(f)
+		if lexeme != "(":
+			self.print_error("(", token, lexeme)
+
+		# <Parameter> ::= <IDs> <Qualifier>, separated by commas. Parameters
+		# and declarations are local to the function
+		self.symbols.enter(name)
+		params = []
+		token, lexeme = self.get_lex(f)
+		while token == "identifier":
+			if self.trace: self.print_rule(R_PARAMETER)
+			names = []
+			while token == "identifier":
+				names.append((token, lexeme))
+				token, lexeme = self.get_lex(f)
+				if lexeme != ",":
+					break
+				token, lexeme = self.get_lex(f)
+			if lexeme not in QUALIFIERS:
+				self.print_error("integer, boolean or real", token, lexeme)
+			if self.trace: self.print_rule(QUALIFIER_RULES[lexeme])
+			params.extend(self.declare(t, l, lexeme) for t, l in names)
+			token, lexeme = self.get_lex(f)
+			if lexeme == ",":
+				token, lexeme = self.get_lex(f)
+		if lexeme != ")":
+			self.print_error(")", token, lexeme)
+
+		# Defined before the body, so it may call itself
+		function = self.functions[name] = Function(name, params, self.index)
+		self.current = function
+		token, lexeme = self.get_lex(f)
+		if lexeme in QUALIFIERS:
+			if self.trace: self.print_rule(R_OPT_DECLARATIONS)
+		while lexeme in QUALIFIERS:
+			token, lexeme = self.declaration(f, token, lexeme)
+			token, lexeme = self.get_lex(f)
+		if lexeme != "{":
+			self.print_error("{", token, lexeme)
+		if self.trace: self.print_rule(R_BODY)
+		token, lexeme = self.statement_list(f, token, lexeme)
+		if lexeme != "}":
+			self.print_error("}", token, lexeme)
+		self.at = (self.num, f.start)
+		self.marked = None
+		if self.reachable(function.entry):
+			# Running off the end returns the default value
+			self.gen_default(function)
+			self.gen_instr(RET, None)
+		self.current = None
+		self.symbols.leave()
+
+		# Small leaf functions are kept for the inliner
+		body = [(self.table.op[addr-1], self.table.operand(addr)) for addr in range(function.entry, self.index - 1)]
+		if len(body) <= INLINE_LIMIT and all(op != CALL for op, oprnd in body):
+			function.body = body
+		return self.get_lex(f)
+
+	def opt_dec_list(self, f, token, lexeme):
+		if self.trace: self.print_rule(R_OPT_DECLARATIONS)
+		token, lexeme, declared = self.declaration_list(f, token, lexeme)
+		token, lexeme = self.statement_list(f, token, lexeme, declared, True)
+		return token, lexeme
+
+	def declaration_list(self, f, token, lexeme):
+		if self.trace: self.print_rule(R_DECLARATION_LIST)
+		token, lexeme = self.get_lex(f)
+		token, lexeme = self.declaration(f, token, lexeme)
+		if lexeme == ";":
+			return token, lexeme, False
+		return token, lexeme, True
+
+	def declaration(self, f, token, lexeme):
+		if lexeme == "integer":
+			if self.trace: self.print_rule(R_DECLARE_INTEGER)
+			token, lexeme = self.get_lex(f)
+			token, lexeme = self.dprime(f, token, lexeme, "integer")
+			if lexeme != ";":
+				self.print_error(";", token, lexeme)
+		elif lexeme == "boolean":
+			if self.trace: self.print_rule(R_DECLARE_BOOLEAN)
+			token, lexeme = self.get_lex(f)
+			token, lexeme = self.dprime(f, token, lexeme, "boolean")
+			if lexeme != ";":
+				self.print_error(";", token, lexeme)
+		elif lexeme == "real":
+			if self.trace: self.print_rule(R_DECLARE_REAL)
+			token, lexeme = self.get_lex(f)
+			token, lexeme = self.dprime(f, token, lexeme, "real")
+			if lexeme != ";":
+				self.print_error(";", token, lexeme)
+
+		return token, lexeme
+
+	def dprime(self, f, token, lexeme, qualifier):
+		# Loop rather than recurse per identifier, declarations can be long
+		while token == "identifier":
+			if self.trace: self.print_rule(QUALIFIER_RULES[qualifier])
+			self.declare(token, lexeme, qualifier)
+			token, lexeme = self.get_lex(f)
+			if lexeme != ",":
+				break
+			token, lexeme = self.get_lex(f)
+
+		return token, lexeme
+
+	def statement_list(self, f, token, lexeme, declared=False, declaring=False):
+		# Loop rather than recurse per statement, programs can be long.
+		# An if statement ends on the token after fi, so that one is
+		# already in hand. While declaring, more declarations may come
+		# before the first statement
+		while True:
+			if self.trace: self.print_rule(R_STATEMENT_LIST)
+
+			if not declared:
+				token, lexeme = self.get_lex(f)
+
+			if lexeme == "}" or lexeme == None:
+				break
+			if declaring and lexeme in QUALIFIERS:
+				if self.trace: self.print_rule(R_DECLARATION_LISTS)
+				token, lexeme = self.declaration(f, token, lexeme)
+				declared = False
+				continue
+			declaring = False
+			try:
+				token, lexeme = self.statement(f, token, lexeme)
+			except Panic as e:
+				token, lexeme = self.synchronize(f, *e.args)
+				self.ahead = lexeme != ";" and lexeme != "fi"
+			declared = self.ahead
+			self.ahead = False
+			if lexeme == "$$":
+				break
+		return token, lexeme
+
+	def statement(self, f, token, lexeme):
+		self.ahead = False
+		outer = self.at
+		self.at = (self.num, f.start)
+		self.marked = None
+		if token == "identifier":
+			if self.trace: self.print_rule(R_ASSIGN_STATEMENT)
+			token, lexeme = self.assign(f, token, lexeme)
+			if lexeme != ";":
+				self.print_error(";", token, lexeme)
+		elif lexeme == "if":
+			if self.trace: self.print_rule(R_IF_STATEMENT)
+			token, lexeme = self.if_state(f, token, lexeme)
+		elif lexeme == "while":
+			if self.trace: self.print_rule(R_WHILE_STATEMENT)
+			token, lexeme = self.while_loop(f, token, lexeme)
+		elif lexeme == "read":
+			if self.trace: self.print_rule(R_READ_STATEMENT)
+			token, lexeme = self.read_state(f, token, lexeme)
+		elif lexeme == "write":
+			if self.trace: self.print_rule(R_WRITE_STATEMENT)
+			token, lexeme = self.write_state(f, token, lexeme)
+		elif lexeme == "return":
+			if self.trace: self.print_rule(R_RETURN_STATEMENT)
+			token, lexeme = self.return_state(f, token, lexeme)
+			if lexeme != ";":
+				self.print_error(";", token, lexeme)
+		elif lexeme == "{":
+			if self.trace: self.print_rule(R_COMPOUND_STATEMENT)
+			token, lexeme = self.compound(f, token, lexeme)
+			if lexeme != "}":
+				self.print_error("}", token, lexeme)
+		elif lexeme == "$$":
+			pass
+		else:
+			self.print_error("<Statement>", token, lexeme)
+
+		self.at = outer
+		self.marked = None
+		return token, lexeme
+
+	def return_state(self, f, token, lexeme):
+		# The value is left on the stack for the caller, a function always
+		# returns one. The first one it returns gives its type
+		token, lexeme = self.get_lex(f)
+		if lexeme == ";":
+			if self.trace: self.print_rule(R_RETURN)
+			if self.current is not None:
+				self.gen_default(self.current)
+		else:
+			if self.trace: self.print_rule(R_RETURN_VALUE)
+			token, lexeme, node = self.expr_tree(f, token, lexeme)
+			function = self.current
+			if function is not None:
+				if function.type is None:
+					function.type = "real" if is_real(node) else "integer"
+				node = coerce(node, function.type)
+			self.gen_expr(node)
+		self.gen_instr(RET, None)
+		return token, lexeme
+
+	def compound(self, f, token, lexeme):
+		token, lexeme = self.statement_list(f, token, lexeme)
+		return token, lexeme
+
+	def assign(self, f, token, lexeme):
+		self.save = lexeme
+		self.saveType = token
+		addr = self.get_address(self.saveType, self.save)
+		if self.trace: self.print_rule(R_ASSIGN_STATEMENT)
+
+		if token == "identifier":
+			if self.trace: self.print_rule(R_ASSIGN)
+			token, lexeme = self.get_lex(f)
+			if lexeme == "=":
+				qualifier = self.symbols.type(addr)
+				token, lexeme = self.get_lex(f)
+				token, lexeme = self.express(f, token, lexeme, qualifier)
+				self.gen_instr(POPMF if qualifier == "real" else POPM, addr)
+				if self.trace: self.print_rule(R_EXPRESSION_EMPTY)
+			else:
+				self.print_error("=", token, lexeme)
+		else:
+			self.print_error("identifier", token, lexeme)
+
+		return token, lexeme
+
+	def express(self, f, token, lexeme, qualifier=None):
+		# Code for an expression, converted for a variable of type
+		# qualifier if given
+		token, lexeme, node = self.expr_tree(f, token, lexeme)
+		if qualifier is not None:
+			node = coerce(node, qualifier)
+		self.gen_expr(node)
+		return token, lexeme
+
+	def expr_tree(self, f, token, lexeme):
+		# Operator precedence parsing with explicit stacks, so arbitrarily long
+		# expressions never recurse. Builds a tree of compact nodes: leaves are
+		# (op, operand) push instructions, inner nodes are (op, left, right)
+		# and calls (CALL, function, arguments)
+		if self.trace: self.print_rule(R_EXPRESSION)
+		nodes = []
+		ops = []
+
+		while True:
+			if self.trace: self.print_rule(R_TERM)
+			token, lexeme, node = self.factor(f, token, lexeme)
+			nodes.append(node)
+
+			if lexeme == "*" or lexeme == "/":
+				if self.trace: self.print_rule(OPERATOR_RULES[lexeme])
+			else:
+				if self.trace: self.print_rule(R_TERM_EMPTY)
+				if lexeme == "+" or lexeme == "-":
+					if self.trace: self.print_rule(OPERATOR_RULES[lexeme])
+				else:
+					break
+
+			# Left associative: reduce everything of equal or higher precedence
+			prec, op = BINARY[lexeme]
+			while ops and ops[-1][0] >= prec:
+				reduce_expr(nodes, ops.pop()[1])
+			ops.append((prec, op))
+			token, lexeme = self.get_lex(f)
+
+		while ops:
+			reduce_expr(nodes, ops.pop()[1])
+		return token, lexeme, nodes[0]
+
+	def gen_expr(self, node):
+		# Post-order walk with an explicit stack
+		stack = [node]
+		while stack:
+			node = stack.pop()
+			if node == None:
+				continue
+			elif node[0] == CALL:
+				# Arguments left to right, then the call itself. A function
+				# calling itself first saves its cells on the stack
+				if len(node) == 3:
+					if node[1] is self.current:
+						for addr in self.frame():
+							self.gen_instr(PUSHMF if self.symbols.type(addr) == "real" else PUSHM, addr)
+					stack.append((CALL, node[1]))
+					stack.extend(reversed(node[2]))
+				else:
+					self.gen_call(node[1])
+			elif len(node) == 2:
+				self.gen_instr(node[0], node[1])
+			elif len(node) == 3:
+				stack.append((node[0],))
+				stack.append(node[2])
+				stack.append(node[1])
+			else:
+				self.gen_instr(node[0], None)
+
+	def gen_default(self, function):
+		# The value of return without an expression: 0 of the function's
+		# type, integer if nothing was returned before
+		if function.type is None:
+			function.type = "integer"
+		if function.type == "real":
+			self.gen_instr(PUSHC, self.symbols.constant(0.0))
+		else:
+			self.gen_instr(PUSHI, 0)
+
+	def reachable(self, entry):
+		# Whether code from entry on can run into the next instruction:
+		# it does not end in a jump or return, or something jumps there
+		end = self.index
+		if end == entry or self.table.op[end-2] != RET and self.table.op[end-2] != JUMP:
+			return True
+		return any(self.table.op[addr-1] in (JUMP, JUMPZ) and self.table.operand(addr) == end for addr in range(entry, end))
+
+	def gen_call(self, function):
+		# Arguments are on the stack, last on top
+		for addr in reversed(function.params):
+			self.gen_instr(POPMF if self.symbols.type(addr) == "real" else POPM, addr)
+		if self.optimize and function.body is not None:
+			for op, oprnd in list(function.inline(self.index)):
+				self.gen_instr(op, oprnd)
+			self.inlined += 1
+		else:
+			self.gen_instr(CALL, function.entry)
+			if function is self.current and self.frame():
+				# The result waits in a cell of its own while the caller's
+				# cells come back off the stack
+				real = function.type == "real"
+				if function.result is None:
+					function.result = self.symbols.temporary(function.type)
+				self.gen_instr(POPMF if real else POPM, function.result)
+				for addr in reversed(self.frame()):
+					self.gen_instr(POPMF if self.symbols.type(addr) == "real" else POPM, addr)
+				self.gen_instr(PUSHMF if real else PUSHM, function.result)
+
+	def frame(self):
+		# Cells of the parameters and locals of the function being compiled,
+		# which a call to itself would overwrite
+		return sorted(self.symbols.scope.values())
+
+	def factor(self, f, token, lexeme):
+		node = None
+		if token == "identifier" and lexeme in self.functions:
+			token, lexeme, node = self.call(f, token, lexeme)
+		elif token == "identifier":
+			if self.trace: self.print_rule(R_FACTOR_IDENTIFIER)
+			addr = self.get_address(token, lexeme)
+			node = (PUSHMF if self.symbols.type(addr) == "real" else PUSHM, addr)
+			token, lexeme = self.get_lex(f)
+		elif token == "integer":
+			if self.trace: self.print_rule(R_FACTOR_INTEGER)
+			node = (PUSHI, lexeme)
+			token, lexeme = self.get_lex(f)
+		elif token == "real":
+			if self.trace: self.print_rule(R_FACTOR_REAL)
+			node = (PUSHC, self.symbols.constant(float(lexeme)))
+			token, lexeme = self.get_lex(f)
+		elif lexeme == "true" or lexeme == "false":
+			if self.trace: self.print_rule(FACTOR_RULES[lexeme])
+			node = (PUSHI, lexeme)
+			token, lexeme = self.get_lex(f)
+		elif lexeme == "(":
+			if self.trace: self.print_rule(R_FACTOR_PAREN)
+			token, lexeme = self.get_lex(f)
+			token, lexeme, node = self.expr_tree(f, token, lexeme)
+			if lexeme != ")":
+				self.print_error(")", token, lexeme)
+			token, lexeme = self.get_lex(f)
+		else:
+			self.print_error("identifier or integer or boolean", token, lexeme)
+		return token, lexeme, node
+
+	def call(self, f, token, lexeme):
+		# <Identifier> ( <IDs> ), taking any expressions as arguments
+		if self.trace: self.print_rule(R_FACTOR_CALL)
+		function = self.functions[lexeme]
+		args = []
+		token, lexeme = self.get_lex(f)
+		if lexeme != "(":
+			self.print_error("(", token, lexeme)
+		token, lexeme = self.get_lex(f)
+		while lexeme != ")":
+			token, lexeme, node = self.expr_tree(f, token, lexeme)
+			args.append(node)
+			if lexeme == ",":
+				token, lexeme = self.get_lex(f)
+			elif lexeme != ")":
+				self.print_error(", or )", token, lexeme)
+		if len(args) != len(function.params):
+			self.print_error("{0} arguments to {1}".format(len(function.params), function.name), token, lexeme)
+		token, lexeme = self.get_lex(f)
+		if function is self.current and function.type is None:
+			# Calling itself before any return: the result is an integer
+			function.type = "integer"
+		args = tuple(coerce(node, self.symbols.type(addr)) for node, addr in zip(args, function.params))
+		return token, lexeme, (CALL, function, args)
+
+	def while_loop(self, f, token, lexeme):
+		addr = self.index
+		self.gen_instr(LABEL, None)
+		token, lexeme = self.get_lex(f)
+		if lexeme == "(":
+			token, lexeme = self.get_lex(f)
+			token, lexeme = self.condition(f, token, lexeme)
+			if lexeme == ")":
+				token, lexeme = self.get_lex(f)
+				token, lexeme = self.statement(f, token, lexeme)
+				self.gen_instr(JUMP, addr)
+				self.back_patch(self.index)
+			else:
+				self.print_error(")", token, lexeme)
+		else:
+			self.print_error("(", token, lexeme)
+
+		return token, lexeme
+
+	def back_patch(self, jump_addr):
+		addr = self.jump.pop()
+		self.table.patch(addr, jump_addr)
+
+	def condition(self, f, token, lexeme):
+		# One tree for both sides, so an integer compared with a real
+		# is converted
+		token, lexeme, node = self.expr_tree(f, token, lexeme)
+		if lexeme in RELOPS:
+			op = RELOPS[lexeme]
+			token, lexeme = self.get_lex(f)
+			token, lexeme, right = self.expr_tree(f, token, lexeme)
+			nodes = [node, right]
+			reduce_expr(nodes, op)
+			self.gen_expr(nodes[0])
+			self.jump.append(self.index)
+			self.gen_instr(JUMPZ, None)
+		else:
+			self.gen_expr(node)
+			self.print_error("<, >, ==, !=", token, lexeme)
+		return token, lexeme
+
+	def if_state(self, f, token, lexeme):
+		token, lexeme = self.get_lex(f)
+		if lexeme == "(":
+			addr = self.index
+			token, lexeme = self.get_lex(f)
+			token, lexeme = self.condition(f, token, lexeme)
+			then = self.index
+			if lexeme == ")":
+				token, lexeme = self.get_lex(f)
+				token, lexeme = self.statement(f, token, lexeme)
+				if lexeme != ";":
+					self.print_error(";", token, lexeme)
+				token, lexeme = self.get_lex(f)
+				pending = True
+				if lexeme == "else":
+					# The condition jumps to the else branch, and the then
+					# branch over it unless it cannot fall through
+					pending = self.reachable(then)
+					if pending:
+						self.gen_instr(JUMP, None)
+					self.back_patch(self.index)
+					if pending:
+						self.jump.append(self.index - 1)
+				token, lexeme = self.else_state(f, token, lexeme)
+				if pending:
+					self.back_patch(self.index)
+				if lexeme == "fi":
+					token, lexeme = self.get_lex(f)
+					self.ahead = True
+				else:
+					self.print_error("fi", token, lexeme)
+			else:
+				self.print_error(")", token, lexeme)
+		else:
+			self.print_error("(", token, lexeme)
+		return token, lexeme
+
+	def else_state(self, f, token, lexeme):
+		if lexeme == "else":
+			if self.trace: self.print_rule(R_ELSE_STATEMENT)
+			token, lexeme = self.get_lex(f)
+			token, lexeme = self.statement(f, token, lexeme)
+			if lexeme != ";":
+				self.print_error(";", token, lexeme)
+			else:
+				token, lexeme = self.get_lex(f)
+		return token, lexeme
+
+	def id_list(self, f, token, lexeme):
+		while token == "identifier":
+			self.get_address(token, lexeme)
+			token, lexeme = self.get_lex(f)
+
+			if lexeme != ",":
+				break
+			token, lexeme = self.get_lex(f)
+		return token, lexeme
+
+	def read_state(self, f, token, lexeme):
+		if self.trace: self.print_rule(R_READ)
+		token, lexeme = self.get_lex(f)
+		if lexeme == "(":
+			if self.trace: self.print_rule(R_IDS)
+			token, lexeme = self.get_lex(f)
+			if token != "identifier":
+				self.print_error("identifier", token, lexeme)
+			addr = self.get_address(token, lexeme)
+			token, lexeme = self.id_list(f, token, lexeme)
+			if lexeme == ")":
+				if self.symbols.type(addr) == "real":
+					self.gen_instr(PUSHSF, None)
+					self.gen_instr(POPMF, addr)
+				else:
+					self.gen_instr(PUSHS, None)
+					self.gen_instr(POPM, addr)
+				token, lexeme = self.get_lex(f)
+				if lexeme != ";":
+					self.print_error(";", token, lexeme)
+			else:
+				self.print_error(")", token, lexeme)
+		else:
+			self.print_error("(", token, lexeme)
+		return token, lexeme
+
+	def write_state(self, f, token, lexeme):
+		token, lexeme = self.get_lex(f)
+		if lexeme == "(":
+			token, lexeme = self.get_lex(f)
+			token, lexeme, node = self.expr_tree(f, token, lexeme)
+			self.gen_expr(node)
+			if lexeme == ")":
+				self.gen_instr(POPSF if is_real(node) else POPS, None)
+				token, lexeme = self.get_lex(f)
+				if lexeme != ";":
+					self.print_error(";", token, lexeme)
+			else:
+				self.print_error(")", token, lexeme)
+		else:
+			self.print_error("(", token, lexeme)
+		return token, lexeme
+
+	def lexer(self, f, n=0):
+
+		# Walk the buffer one token at a time, or replay the cached token
+		# stream instead of lexing again
+		tokens = f.tokens if f.complete else None
+		while True:
+			if tokens is not None:
+				i = f.cursor
+				if i < len(tokens):
+					f.cursor += 1
+					kind = tokens.kind[i]
+					f.start = tokens.start[i]
+					f.end = tokens.end[i]
+					self.num = tokens.line[i]
+				else:
+					kind = None
+					self.num = f.line
+			else:
+				kind = fsm(f)
+				self.num = f.line
+				if kind != None and f.tokens is not None:
+					f.tokens.append(kind, f.start, f.end, self.num)
+
+			if kind == None:
+				f.complete = f.tokens is not None
+				break
+
+			token = get_token(kind)
+			lexeme = f.text[f.start:f.end]
+
+			if self.test:
+				self.errors = self.compare_token(self.count, token, lexeme, n)
+				self.count += 1
+			elif self.stage > 1:
+				return token, lexeme
+			elif self.debug:
+				print("{0:2} {1:4} {2:15} {3:10}".format(self.num, "", token, lexeme))
+			else:
+				self.print_token(token, lexeme)
+
+		if self.errors > 0:
+			self.flush()
+			print("ARRRR: Unit test", n, "failed")
+
+	def unit_test(self, n):
+		print("==> running unit test", n)
+		testcase = self.golden(n, "rat")
+		print(testcase, "\n================")
+		self.unit = n
+		self.text = testcase
+		self.source = None
+		self.actual = {}
+		self.target(n)
+
+	def golden(self, n, kind):
+		# Expected rows of unit test n, see load_fixtures()
+		case = load_fixtures().get(n, {})
+		if kind not in case:
+			self.flush()
+			print("ARRRR: Invalid test case")
+			exit(4)
+		return case[kind]
+
+	def record(self, kind, row):
+		# Snapshot update: keep what the compiler produced instead
+		self.actual.setdefault(kind, []).append(row)
+		return self.errors
+
+	def compare_token(self, count, token, lexeme, n):
+		self.flush()
+		if self.update:
+			return self.record("tokens", (token, lexeme))
+		expected = self.golden(n, "tokens")
+
+		if len(expected) > count:
+			token_unit, lexeme_unit = expected[count]
+			if token_unit == token and lexeme_unit == lexeme:
+				status = "OK"
+			else:
+				status = "\033[1;31mFAIL\033[0m"
+				self.errors += 1
+
+			print("{0:10} {1:10} {2:15} {3:10} {4}".format(status, token_unit, lexeme_unit, token, lexeme))
+		else:
+			print("==> FATAL ERROR: unexpected EOF")
+			exit(5)
+
+		return self.errors
+
+	def compare_rule(self, count, syntax, unit):
+		self.flush()
+		if self.update:
+			return self.record("rules", syntax)
+		expected = self.golden(unit, "rules")
+
+		if len(expected) > count:
+			if expected[count] == syntax:
+				status = "OK"
+			else:
+				status = "\033[1;31mFAIL\033[0m"
+				self.errors += 1
+
+			print("  {0}\n  {1}\n{2}".format(expected[count], syntax, status))
+		else:
+			print("==> FATAL ERROR: unexpected EOF")
+			exit(5)
+
+		return self.errors
+
+	def compare_asm(self, count, address, op, oprnd, unit):
+		self.flush()
+		kind = "opt" if self.optimize else "ssa" if self.ssa else "asm"
+		if self.update:
+			return self.record(kind, (str(address), str(op), str(oprnd)))
+		expected = self.golden(unit, kind)
+
+		if len(expected) > count:
+			address_unit, op_unit, oprnd_unit = expected[count]
+			if address_unit == str(address) and op_unit == str(op) and oprnd_unit == str(oprnd):
+				status = "OK"
+			else:
+				status = "\033[1;31mFAIL\033[0m"
+				self.errors += 1
+
+			print("{0}         {1:5}            {2:5}     {3}".format(address_unit, op_unit, oprnd_unit, ""))
+			print("{0}         {1:5}            {2:5}     {3}\n".format(str(address), str(op), str(oprnd), status))
+		else:
+			print("==> FATAL ERROR: unexpected EOF")
+			exit(5)
+
+		return self.errors
+
+	def compare_mem(self, icount, varid, location, vartype, unit):
+		self.flush()
+		if self.update:
+			return self.record("symbols", (str(varid), str(location), str(vartype)))
+		expected = self.golden(unit, "symbols")
+		i = icount-len(self.symbols.ids)+1
+
+		if len(expected) > i:
+			varid_unit, location_unit, vartype_unit = expected[i]
+			if varid_unit == str(varid) and location_unit == str(location) and vartype_unit == str(vartype):
+				status = "OK"
+			else:
+				status = "\033[1;31mFAIL\033[0m"
+				self.errors += 1
+
+			print("{0:5}        {1:5}        {2:8}     {3}".format(varid_unit, location_unit, vartype_unit, ""))
+			print("{0:5}        {1:5}        {2:8}     {3}\n".format(str(varid), str(location), str(vartype), status))
+
+		else:
+			print("==> FATAL ERROR: unexpected EOF")
+			exit(5)
+
+		return self.errors
+
+	def compare_output(self, unit):
+		# Run the unit on its unitN.input and check what it writes, one
+		# value per row; a row missing on either side fails
+		import io
+		out = io.StringIO()
+		self.execute(self.table, io.StringIO(load_fixtures()[unit].get("input", "")), out)
+		rows = out.getvalue().split("\n")[:-1]
+		if self.update:
+			for row in rows:
+				self.record("output", row)
+			return self.errors
+		expected = self.golden(unit, "output")
+
+		for count in range(max(len(expected), len(rows))):
+			value_unit = expected[count] if count < len(expected) else ""
+			value = rows[count] if count < len(rows) else ""
+			if count < len(expected) and count < len(rows) and value_unit == value:
+				status = "OK"
+			else:
+				status = "\033[1;31mFAIL\033[0m"
+				self.errors += 1
+
+			print("{0:10}   {1}".format(value_unit, ""))
+			print("{0:10}   {1}\n".format(value, status))
+
+		return self.errors
+
+	def compare_const(self, count, value, index, kind, unit):
+		self.flush()
+		if self.update:
+			return self.record("constants", (str(value), str(index), kind))
+		expected = self.golden(unit, "constants")
+
+		if len(expected) > count:
+			value_unit, index_unit, kind_unit = expected[count]
+			if value_unit == str(value) and index_unit == str(index) and kind_unit == kind:
+				status = "OK"
+			else:
+				status = "\033[1;31mFAIL\033[0m"
+				self.errors += 1
+
+			print("{0:10}   {1:5}        {2:8}     {3}".format(value_unit, index_unit, kind_unit, ""))
+			print("{0:10}   {1:5}        {2:8}     {3}\n".format(str(value), str(index), kind, status))
+		else:
+			print("==> FATAL ERROR: unexpected EOF")
+			exit(5)
+
+		return self.errors
+
+
+def compile_source(text, mode="--assembly", optimize=False, format="text", recover=0):
+	# Compile a program held in memory, a string or a file object such as
+	# io.StringIO, in one of the command line modes without touching the
+	# disk. Returns (exit code, console output, log output)
+	import contextlib, io
+	if not isinstance(text, str):
+		text = text.read()
+	console = io.StringIO()
+	c = Compiler()
+	c.text = text
+	c.optimize = optimize
+	c.format = format
+	c.recover = recover
+	c.log = io.StringIO()
+	code = 0
+	try:
+		with contextlib.redirect_stdout(console), contextlib.redirect_stderr(console):
+			run(c, mode)
+	except SystemExit as e:
+		code = e.code if isinstance(e.code, int) else 1
+	return code, console.getvalue(), c.log.getvalue()
+
+
+def compile_file(path, cache=None, optimize=False, format="text", recover=0):
+	# Batch worker: compile one file like the default mode, into a log
+	# next to the source. Returns (path, exit code, console output, seconds)
+	import contextlib, io, time
+	from .cache import CompileCache
+	console = io.StringIO()
+	c = Compiler(path)
+	c.output = os.path.splitext(path)[0] + ".log"
+	c.mode = "all"
+	c.optimize = optimize
+	c.format = format
+	c.recover = recover
+	if cache is not None:
+		c.cache = CompileCache(*cache)
+	code = 0
+	start = time.perf_counter()
+	try:
+		c.log = open(c.output, 'w')
+		with contextlib.redirect_stdout(console), contextlib.redirect_stderr(console):
+			c.pipeline()
+	except SystemExit as e:
+		code = e.code if isinstance(e.code, int) else 1
+	except Exception as e:
+		console.write("ARRRR: internal error: {0!r}\n".format(e))
+		code = 1
+	finally:
+		if c.log:
+			c.log.close()
+	return path, code, console.getvalue(), time.perf_counter() - start
+
+
+def run(c, option):
+	# Parse parameters
+	c.mode = {"-d": "--debug", "-l": "--lexer", "-s": "--syntaxer", "-a": "--assembly", "-y": "--symbols"}.get(option, option)
+	if option == "all":
+		c.pipeline()
+		c.status("==> saved to " + c.output)
+	elif option == "%":
+		c.verbose = True
+		c.pipeline()
+		c.status("==> saved to " + c.output)
+	elif option == "--":
+		c.logfile = False
+		c.verbose = True
+		c.pipeline()
+	elif option == "--debug" or option == "-d":
+		c.debug = True
+		c.stage = 1
+		c.target()
+	elif option == "--lexer" or option == "-l":
+		c.logfile = False
+		c.verbose = True
+		c.stage = 1
+		c.target()
+	elif option == "--syntaxer" or option == "-s":
+		c.logfile = False
+		c.verbose = True
+		c.stage = 2
+		c.target()
+	elif option == "--assembly" or option == "-a":
+		c.logfile = False
+		c.verbose = False
+		c.stage = 3
+		c.target()
+	elif option == "--run":
+		c.logfile = False
+		c.run = True
+		c.stage = 3
+		c.target()
+	elif option == "--ir":
+		c.logfile = False
+		c.ir = True
+		c.stage = 3
+		c.target()
+	elif option == "--annotate":
+		c.logfile = False
+		c.annotate = True
+		c.stage = 3
+		c.target()
+	elif option == "--ratc":
+		c.logfile = False
+		c.object = True
+		c.stage = 3
+		c.target()
+	elif option == "--disasm":
+		c.logfile = False
+		c.verbose = False
+		c.stage = 3
+		c.target()
+	elif option == "--vm-bench":
+		c.logfile = False
+		c.stage = 2
+		c.vm_benchmark()
+	elif option == "--symbols" or option == "-y":
+		c.logfile = False
+		c.symtab = True
+		c.stage = 3
+		c.target()
+	elif option == "--test" or option == "-t":
+		c.test = True
+		c.stage = 1
+		for n in golden_units("--test"):
+			c.unit_test(n)
+	elif option == "--rules" or option == "-r":
+		c.logfile = False
+		c.rules = True
+		c.verbose = True
+		c.stage = 2
+		for n in golden_units("--rules"):
+			c.unit_test(n)
+	elif option == "--memory" or option == "-m":
+		c.logfile = False
+		c.memory = True
+		c.verbose = False
+		c.stage = 3
+		for n in golden_units("--memory"):
+			c.unit_test(n)
+		if len(c.fail) > 0:
+			c.verbose = True
+			c.banner()
+			print("ARRRR: Unit test(s)", str(c.fail).strip('[]'), "failed")
+	else:
+		print("ARRRR: unknown function call")
+		exit(3)
@@ -0,0 +1,11 @@
+# Defaults shared by the compiler and the command line
+
+import os
+
+output = "rat15su.log"
+version = "2.3"
+cache_limit = 64 * 2**20
+recover_limit = 100
+call_limit = 2**16
+lex_chunk = 2**18
+fixture_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
@@ -0,0 +1,577 @@
+# SSA register form of the instruction table: lift, validate, optimize,
+# lower
+
+from collections import namedtuple
+
+from .assembly import ADD, ADDF, CALL, EQU, EQUF, FTOI, GRT, GRTF, ITOF, InstrBuffer, JUMP, JUMPZ, LABEL, LES, LESF, MUL, MULF, NEQ, NEQF, \
+	OPCODES, POPM, POPMF, POPS, POPSF, PUSHC, PUSHI, PUSHM, PUSHMF, PUSHS, PUSHSF, REAL_OPS, REAL_RESULTS, RET
+
+
+# SSA register IR. An instruction defines at most one register (dest)
+# from registers (args); oprnd is the memory address, constant or target
+# block of the stack instruction it stands for
+IRInstr = namedtuple("IRInstr", "dest op args oprnd")
+IR_NAMES = {PUSHI: "const", PUSHM: "load", POPM: "store", PUSHS: "read", POPS: "write", CALL: "call", JUMP: "jump", JUMPZ: "jumpz", RET: "ret",
+            PUSHC: "constf", PUSHMF: "loadf", POPMF: "storef", PUSHSF: "readf", POPSF: "writef", ITOF: "itof", FTOI: "ftoi"}
+IR_NAMES.update((op, OPCODES[op].lower()) for op in list(REAL_OPS) + list(REAL_OPS.values()))
+PUSH_OPS = frozenset([PUSHI, PUSHM, PUSHS, PUSHC, PUSHMF, PUSHSF])
+POP_OPS = frozenset([POPM, POPS, POPMF, POPSF])
+BINARY_OPS = frozenset(list(REAL_OPS) + list(REAL_OPS.values()))
+# Registers used and whether one is defined
+IR_ARITY = {CALL: (0, True), JUMP: (0, False), JUMPZ: (1, False), ITOF: (1, True), FTOI: (1, True)}
+IR_ARITY.update((op, (0, True)) for op in PUSH_OPS)
+IR_ARITY.update((op, (1, False)) for op in POP_OPS)
+IR_ARITY.update((op, (2, True)) for op in BINARY_OPS)
+# Operand types: True where a register must hold a real
+IR_OPERANDS = {POPM: (False,), POPS: (False,), JUMPZ: (False,), ITOF: (False,), POPMF: (True,), POPSF: (True,), FTOI: (True,)}
+IR_OPERANDS.update((op, (ADDF <= op <= NEQF,) * 2) for op in BINARY_OPS)
+# Operations that give the same with their operands swapped, as which
+SWAPPED = {ADD: ADD, MUL: MUL, EQU: EQU, NEQ: NEQ, LES: GRT, GRT: LES, ADDF: ADDF, MULF: MULF, EQUF: EQUF, NEQF: NEQF, LESF: GRTF, GRTF: LESF}
+# Stack effect of each opcode; RET empties the stack
+DEPTH = [1 if op in PUSH_OPS or op == CALL else -1 if op in POP_OPS or op in BINARY_OPS or op == JUMPZ else 0 for op in range(len(OPCODES))]
+
+
+class Block:
+	# Basic block: phis are the registers on the stack at entry, with
+	# incoming[pred] the registers each predecessor leaves there; term is
+	# the closing jump or ret, None to fall through to the next block.
+	# addrs has the stack address of each instruction, body then term
+	def __init__(self, id, addr, labeled):
+		self.id = id
+		self.addr = addr
+		self.labeled = labeled
+		self.phis = None
+		self.incoming = {}
+		self.body = []
+		self.term = None
+		self.addrs = []
+		self.succs = []
+		self.preds = []
+
+
+class IR:
+	# Blocks in address order, entries are main (block 1) and the
+	# function entries. Variables stay in memory (load/store); registers
+	# hold what the stack machine keeps on its stack
+	def __init__(self):
+		self.blocks = []
+		self.entries = []
+		self.registers = 0
+
+	def register(self):
+		self.registers += 1
+		return self.registers
+
+	def dump(self):
+		# Text listing, one line per block header, phi and instruction
+		for b in self.blocks:
+			head = "B{0}:".format(b.id)
+			notes = ["address {0}".format(b.addr)]
+			if b.labeled:
+				notes.append("label")
+			if b.id in self.entries:
+				notes.append("entry")
+			if b.preds:
+				notes.append("preds " + ", ".join("B{0}".format(p) for p in b.preds))
+			yield "{0:15}; {1}".format(head, ", ".join(notes))
+			for i, r in enumerate(b.phis):
+				incoming = ", ".join("B{0}: %{1}".format(p, b.incoming[p][i]) for p in sorted(b.incoming))
+				yield "    %{0} = phi [{1}]".format(r, incoming)
+			for ins in b.body + ([b.term] if b.term else []):
+				yield "    " + ir_text(ins)
+			if b.term is None and b.succs:
+				yield "    next B{0}".format(b.succs[0])
+
+
+def ir_text(ins):
+	words = [IR_NAMES[ins.op]]
+	if ins.op in (JUMP, JUMPZ, CALL):
+		words.extend("%{0}".format(r) for r in ins.args)
+		words.append("B{0}".format(ins.oprnd) if ins.oprnd != None else "end")
+	else:
+		if ins.oprnd != None:
+			words.append(str(ins.oprnd))
+		words.extend("%{0}".format(r) for r in ins.args)
+	text = words[0] + " " + ", ".join(words[1:]) if len(words) > 1 else words[0]
+	return text if ins.dest == None else "%{0} = {1}".format(ins.dest, text)
+
+
+def lift(table):
+	# Stack code to SSA: every push defines a register, every pop uses
+	# one, and whatever is left on the stack at the end of a block comes
+	# back as the phis of its successors. Raises ValueError for code the
+	# parser does not produce (stack underflow, blocks reached at two
+	# stack depths, targets out of range)
+	size = len(table)
+	ops = table.op
+	args = [table.operand(addr) for addr in range(1, size + 1)]
+
+	leaders = set([1, size + 1])
+	calls = set()
+	for addr in range(1, size + 1):
+		op = ops[addr-1]
+		if op == JUMP or op == JUMPZ or op == CALL:
+			t = args[addr-1]
+			if t != None and not 1 <= t <= size + 1:
+				raise ValueError("address {0}: {1} {2} out of range".format(addr, OPCODES[op], t))
+			leaders.add(size + 1 if t == None else t)
+			if op == CALL:
+				calls.add(size + 1 if t == None else t)
+		if op == JUMP or op == JUMPZ or op == RET:
+			leaders.add(addr + 1)
+		elif op == LABEL:
+			leaders.add(addr)
+
+	ir = IR()
+	starts = sorted(leaders)
+	at = {}
+	for addr in starts:
+		b = Block(len(ir.blocks) + 1, addr, addr <= size and ops[addr-1] == LABEL)
+		at[addr] = b
+		ir.blocks.append(b)
+	ir.entries = [1] + sorted(at[t].id for t in calls if at[t].id != 1)
+
+	def block(t):
+		return at[size + 1 if t == None else t].id
+
+	ends = starts[1:] + [size + 1]
+	for b, end in zip(ir.blocks, ends):
+		last = ops[end-2] if end > b.addr else None
+		if last == JUMP:
+			b.succs = [block(args[end-2])]
+		elif last == JUMPZ:
+			b.succs = [block(args[end-2]), b.id + 1]
+		elif last != RET and b.addr <= size:
+			b.succs = [b.id + 1]
+		for s in b.succs:
+			if b.id not in ir.blocks[s-1].preds:
+				ir.blocks[s-1].preds.append(b.id)
+
+	# Stack depth at the entry of each block, depth first from the
+	# entries and then from whatever no entry reaches
+	depth = [None] * (len(ir.blocks) + 1)
+	roots = ir.entries + [b.id for b in ir.blocks if not b.preds] + [b.id for b in ir.blocks]
+	for b in roots:
+		b = ir.blocks[b-1]
+		if depth[b.id] is not None:
+			continue
+		depth[b.id] = 0
+		pending = [b]
+		while pending:
+			b = pending.pop()
+			end = ends[b.id-1]
+			if end > b.addr and ops[end-2] == RET:
+				out = 0
+			else:
+				out = depth[b.id] + sum(DEPTH[op] for op in ops[b.addr-1:end-1])
+			for s in b.succs:
+				if depth[s] is None:
+					depth[s] = out
+					pending.append(ir.blocks[s-1])
+				elif depth[s] != out:
+					raise ValueError("address {0}: reached with {1} and {2} values on the stack".format(ir.blocks[s-1].addr, depth[s], out))
+
+	def underflow(addr):
+		return ValueError("address {0}: stack underflow".format(addr))
+
+	# Then each block in address order, so registers number top down
+	n = 0
+	for b, end in zip(ir.blocks, ends):
+		b.phis = list(range(n + 1, n + 1 + depth[b.id]))
+		n += depth[b.id]
+		stack = list(b.phis)
+		body = b.body
+		for addr in range(b.addr, end):
+			op = ops[addr-1]
+			oprnd = args[addr-1]
+			if op in PUSH_OPS:
+				n += 1
+				body.append(IRInstr(n, op, (), oprnd))
+				stack.append(n)
+			elif op in POP_OPS:
+				if not stack:
+					raise underflow(addr)
+				body.append(IRInstr(None, op, (stack.pop(),), oprnd))
+			elif op in BINARY_OPS:
+				if len(stack) < 2:
+					raise underflow(addr)
+				n += 1
+				body.append(IRInstr(n, op, (stack[-2], stack[-1]), None))
+				stack[-2:] = [n]
+			elif op == ITOF or op == FTOI:
+				if not stack:
+					raise underflow(addr)
+				n += 1
+				body.append(IRInstr(n, op, (stack.pop(),), None))
+				stack.append(n)
+			elif op == CALL:
+				# Arguments go through memory, the result comes back
+				n += 1
+				body.append(IRInstr(n, op, (), block(oprnd)))
+				stack.append(n)
+			elif op == JUMP:
+				b.term = IRInstr(None, op, (), None if oprnd == None else block(oprnd))
+			elif op == JUMPZ:
+				if not stack:
+					raise underflow(addr)
+				b.term = IRInstr(None, op, (stack.pop(),), None if oprnd == None else block(oprnd))
+			elif op == RET:
+				if len(stack) > 1:
+					raise ValueError("address {0}: RET leaves {1} values".format(addr, len(stack)))
+				b.term = IRInstr(None, op, tuple(stack), None)
+				del stack[:]
+			if op != LABEL:
+				b.addrs.append(addr)
+		for s in b.succs:
+			ir.blocks[s-1].incoming[b.id] = list(stack)
+	ir.registers = n
+	return ir
+
+
+def dominators(ir):
+	# Immediate dominator of each block (Cooper, Harvey and Kennedy), with
+	# block 0 standing for a root above every entry and unreached block
+	roots = set(ir.entries) | set(b.id for b in ir.blocks if not b.preds)
+	order = []
+	seen = set([0])
+	for root in sorted(roots) + [b.id for b in ir.blocks]:
+		if root in seen:
+			continue
+		roots.add(root)
+		seen.add(root)
+		stack = [(root, iter(ir.blocks[root-1].succs))]
+		while stack:
+			b, succs = stack[-1]
+			s = next(succs, None)
+			if s is None:
+				order.append(b)
+				stack.pop()
+			elif s not in seen:
+				seen.add(s)
+				stack.append((s, iter(ir.blocks[s-1].succs)))
+	order.append(0)
+	order.reverse()
+	number = dict((b, i) for i, b in enumerate(order))
+
+	idom = {0: 0}
+	for b in roots:
+		idom[b] = 0
+
+	def intersect(a, b):
+		while a != b:
+			while number[a] > number[b]:
+				a = idom[a]
+			while number[b] > number[a]:
+				b = idom[b]
+		return a
+
+	changed = True
+	while changed:
+		changed = False
+		for b in order[1:]:
+			if b in roots:
+				continue
+			new = None
+			for p in ir.blocks[b-1].preds:
+				if p in idom:
+					new = p if new is None else intersect(p, new)
+			if idom.get(b) != new:
+				idom[b] = new
+				changed = True
+	return idom
+
+
+def entry_returns(ir):
+	# The ret instructions reachable from each entry
+	rets = {}
+	for e in ir.entries:
+		seen = set([e])
+		pending = [e]
+		rets[e] = []
+		while pending:
+			b = ir.blocks[pending.pop()-1]
+			if b.term is not None and b.term.op == RET:
+				rets[e].append(b.term)
+			for s in b.succs:
+				if s not in seen:
+					seen.add(s)
+					pending.append(s)
+	return rets
+
+
+def real_registers(ir):
+	# The registers that hold reals: by the operation defining them,
+	# through phis, and for calls by what the callee returns
+	returns = dict((e, [r for ret in rets for r in ret.args]) for e, rets in entry_returns(ir).items())
+
+	real = set()
+	changed = True
+	while changed:
+		changed = False
+		for b in ir.blocks:
+			for i, r in enumerate(b.phis):
+				if r not in real and any(values[i] in real for values in b.incoming.values()):
+					real.add(r)
+					changed = True
+			for ins in b.body:
+				if ins.dest == None or ins.dest in real:
+					continue
+				if ins.op in REAL_RESULTS or ins.op == CALL and any(r in real for r in returns.get(ins.oprnd, ())):
+					real.add(ins.dest)
+					changed = True
+	return real
+
+
+def validate(ir):
+	# Problems with an IR, as text: registers defined twice or used
+	# where no definition dominates, wrong operand counts or types, bad
+	# targets, calls to functions that can ret nothing, phis that do not
+	# match the predecessors
+	problems = []
+	where = {}
+	ids = set(b.id for b in ir.blocks)
+	for b in ir.blocks:
+		for r in b.phis:
+			if r in where:
+				problems.append("B{0}: %{1} defined twice".format(b.id, r))
+			where[r] = (b.id, -1)
+		for i, ins in enumerate(b.body):
+			if ins.dest != None:
+				if ins.dest in where:
+					problems.append("B{0}: %{1} defined twice".format(b.id, ins.dest))
+				where[ins.dest] = (b.id, i)
+
+	idom = dominators(ir)
+	real = real_registers(ir)
+	# Functions that may return nothing to a call that takes a value
+	empty = set(e for e, rets in entry_returns(ir).items() if any(not ret.args for ret in rets))
+
+	def dominates(a, b):
+		while b != a and b != 0:
+			b = idom[b]
+		return b == a
+
+	def check(b, i, r):
+		if r not in where:
+			problems.append("B{0}: %{1} used but never defined".format(b.id, r))
+			return
+		block, index = where[r]
+		if block == b.id and index >= i or block != b.id and not dominates(block, b.id):
+			problems.append("B{0}: %{1} used where its definition does not dominate".format(b.id, r))
+
+	for b in ir.blocks:
+		if b.phis is None:
+			problems.append("B{0}: never lifted".format(b.id))
+			continue
+		for i, ins in enumerate(b.body + ([b.term] if b.term else [])):
+			if ins.op == RET:
+				count, dest = (len(ins.args), False) if len(ins.args) < 2 else (-1, False)
+			else:
+				count, dest = IR_ARITY.get(ins.op, (-1, False))
+			if count != len(ins.args) or dest != (ins.dest != None):
+				problems.append("B{0}: malformed {1}".format(b.id, ir_text(ins)))
+			if (ins.op == JUMP or ins.op == JUMPZ) and i < len(b.body):
+				problems.append("B{0}: {1} before the end of the block".format(b.id, IR_NAMES[ins.op]))
+			if (ins.op in (JUMP, JUMPZ, CALL)) and ins.oprnd != None and ins.oprnd not in ids:
+				problems.append("B{0}: no block B{1}".format(b.id, ins.oprnd))
+			if ins.op == CALL and ins.dest != None and ins.oprnd in empty:
+				problems.append("B{0}: call B{1}, which can ret without a value".format(b.id, ins.oprnd))
+			for r in ins.args:
+				check(b, i, r)
+			for r, wanted in zip(ins.args, IR_OPERANDS.get(ins.op, ())):
+				if (r in real) != wanted:
+					problems.append("B{0}: {1} takes {2}, %{3} is not".format(b.id, IR_NAMES[ins.op], "a real" if wanted else "an integer", r))
+		if b.term is None or b.term.op == JUMPZ:
+			if b.id < len(ir.blocks) and b.id + 1 not in b.succs:
+				problems.append("B{0}: falls through but B{1} is not a successor".format(b.id, b.id + 1))
+		if sorted(b.incoming) != sorted(b.preds):
+			problems.append("B{0}: phis from {1}, predecessors {2}".format(b.id, sorted(b.incoming), sorted(b.preds)))
+		for i, r in enumerate(b.phis):
+			if any((values[i] in real) != (r in real) for values in b.incoming.values() if i < len(values)):
+				problems.append("B{0}: phi %{1} mixes integers and reals".format(b.id, r))
+		for p, values in b.incoming.items():
+			if len(values) != len(b.phis):
+				problems.append("B{0}: {1} values from B{2} for {3} phis".format(b.id, len(values), p, len(b.phis)))
+			for r in values:
+				if p in ids:
+					check(ir.blocks[p-1], len(ir.blocks[p-1].body) + 1, r)
+	return problems
+
+
+def cse(ir):
+	# Common subexpression elimination within each block: an operation
+	# on the same values as an earlier one reuses its register. Loads
+	# and constants are numbered too, loads until a store to the
+	# variable or a call, so that a + b twice is found. A reused value
+	# lives in a memory cell (see lower()), so only copies larger than
+	# the loads and the store that costs are taken out; operations on
+	# constants count as one instruction, -O folds them. Returns the
+	# number of instructions removed
+	removed = 0
+	for b in ir.blocks:
+		# Values passed on to successors stay where they are: a phi
+		# cannot come from memory
+		passed = set(r for s in b.succs for r in ir.blocks[s-1].incoming[b.id])
+		value = {}
+		known = {}
+		size = {}
+		folded = set()
+		for ins in b.body:
+			if ins.op == POPM or ins.op == POPMF:
+				known.pop((PUSHM, ins.oprnd), None)
+				known.pop((PUSHMF, ins.oprnd), None)
+			elif ins.op == CALL:
+				known = dict((key, r) for key, r in known.items() if key[0] != PUSHM and key[0] != PUSHMF)
+			elif ins.dest != None and ins.op != PUSHS and ins.op != PUSHSF:
+				if ins.op == PUSHI or ins.op == PUSHC or ins.args and all(r in folded for r in ins.args):
+					folded.add(ins.dest)
+					size[ins.dest] = 1
+				else:
+					size[ins.dest] = 1 + sum(size.get(r, 1) for r in ins.args)
+				key = (ins.op,) + tuple(value.get(r, r) for r in ins.args) if ins.args else (ins.op, ins.oprnd)
+				if key in known:
+					value[ins.dest] = known[key]
+				else:
+					known[key] = ins.dest
+		if not value:
+			continue
+
+		# The copies an operation that stays uses. Each use of a value
+		# in memory is a load, the first costs a store as well, and an
+		# operand after it has to go to memory too unless the two swap
+		term = [b.term] if b.term else []
+		user = {}
+		for ins in b.body + term:
+			for k, r in enumerate(ins.args):
+				user[r] = (ins, k)
+
+		def spills(r):
+			ins, k = user[r]
+			return 0 if k == len(ins.args) - 1 or ins.op in SWAPPED else len(ins.args) - 1 - k
+
+		same = {}
+		for ins in b.body + term:
+			if ins.dest in value:
+				continue
+			for r in ins.args:
+				if r in value and r not in passed and value[r] not in passed:
+					c = value[r]
+					cost = 1 + 2 * spills(r) + (0 if c in same.values() else 2 + 2 * spills(c))
+					if size[r] > cost:
+						same[r] = c
+		if not same:
+			continue
+
+		# Memory operands last, so the other one can stay on the stack
+		stored = set(same.values())
+
+		def rewrite(ins):
+			args = tuple(same.get(r, r) for r in ins.args)
+			if len(args) == 2 and args[0] in stored and args[1] not in stored and ins.op in SWAPPED:
+				return ins._replace(op=SWAPPED[ins.op], args=args[::-1])
+			return ins._replace(args=args)
+
+		b.body = [rewrite(ins) for ins in b.body]
+		if b.term:
+			b.term = rewrite(b.term)
+			term = [b.term]
+
+		# Then the copies, now unused, and what only they used
+		uses = dict((r, 1) for r in passed)
+		for ins in b.body + term:
+			for r in ins.args:
+				uses[r] = uses.get(r, 0) + 1
+		body = []
+		addrs = []
+		for ins, addr in reversed(list(zip(b.body, b.addrs))):
+			if ins.dest != None and not uses.get(ins.dest) and ins.op not in (PUSHS, PUSHSF, CALL):
+				for r in ins.args:
+					uses[r] -= 1
+				removed += 1
+				continue
+			body.append(ins)
+			addrs.append(addr)
+		b.addrs[:len(b.body)] = reversed(addrs)
+		b.body = body[::-1]
+	return removed
+
+
+def lower(ir, temp):
+	# SSA back to stack code. A register used once, in stack order, like
+	# everything lift() makes, stays on the stack; any other one is kept
+	# in a memory cell from address temp on. Returns (table, type of
+	# each cell used, stack address each instruction came from)
+	spilled = {}
+	real = None
+	while True:
+		out, labels, more = emit_blocks(ir, spilled)
+		if not more:
+			break
+		if real is None:
+			real = real_registers(ir)
+		for r in sorted(more):
+			spilled[r] = (temp + len(spilled), r in real)
+
+	table = InstrBuffer()
+	for op, oprnd, origin in out:
+		if (op == JUMP or op == JUMPZ or op == CALL) and oprnd != None:
+			oprnd = labels[oprnd]
+		table.append(op, oprnd)
+	return table, ["real" if f else "integer" for addr, f in sorted(spilled.values())], [origin for op, oprnd, origin in out]
+
+
+def emit_blocks(ir, spilled):
+	# One lowering attempt: (instructions with the stack address each
+	# comes from, block addresses, registers that have to move to memory
+	# before it can work)
+	out = []
+	labels = {}
+	more = set()
+	for b in ir.blocks:
+		labels[b.id] = len(out) + 1
+		if b.labeled:
+			out.append((LABEL, None, b.addr))
+		for r in b.phis:
+			if r in spilled:
+				raise ValueError("B{0}: phi %{1} cannot live in memory".format(b.id, r))
+		stack = list(b.phis)
+		for (dest, op, args, oprnd), origin in zip(b.body + ([b.term] if b.term else []), b.addrs):
+			k = len(args)
+			if k and spilled and any(r in spilled for r in args):
+				# Operands from the stack first, then those from memory
+				split = next(i for i, r in enumerate(args) if r in spilled)
+				more.update(r for r in args[split:] if r not in spilled)
+				if tuple(stack[len(stack)-split:]) != args[:split]:
+					more.update(args[:split])
+				else:
+					del stack[len(stack)-split:]
+				for r in args[split:]:
+					if r in spilled:
+						addr, f = spilled[r]
+						out.append((PUSHMF if f else PUSHM, addr, origin))
+			elif k:
+				if tuple(stack[-k:]) != args:
+					# Those after the longest run of them on top of the stack
+					split = next(i for i in range(k - 1, -1, -1) if i == 0 or tuple(stack[-i:]) == args[:i])
+					more.update(args[split:])
+					if split:
+						del stack[-split:]
+					stack = [r for r in stack if r not in args]
+				else:
+					del stack[-k:]
+			out.append((op, oprnd, origin))
+			if dest == None:
+				continue
+			elif spilled and dest in spilled:
+				addr, f = spilled[dest]
+				out.append((POPMF if f else POPM, addr, origin))
+			else:
+				stack.append(dest)
+		for s in b.succs:
+			expected = ir.blocks[s-1].incoming[b.id]
+			if stack != expected:
+				extra = [r for r in stack if r not in expected]
+				if not extra:
+					raise ValueError("B{0}: stack does not match the phis of B{1}".format(b.id, s))
+				more.update(extra)
+	return out, labels, more
@@ -0,0 +1,389 @@
+# Stage 1: character classes, the lexer DFA and token streams
+
+import os, sys
+from array import array
+from collections import namedtuple
+
+from .defaults import lex_chunk
+
+
+# Lexer tables
+KEYWORDS = frozenset(["boolean", "else", "false", "fi", "function", "if", "integer", "read", "real", "return", "true", "while", "write"])
+
+# Character classes
+C_OTHER, C_SPACE, C_NEWLINE, C_SEPARATOR, C_OPERATOR, C_BANG, C_EQUAL, \
+	C_DOLLAR, C_DIGIT, C_DOT, C_LETTER, C_EOF = range(12)
+
+# Accepting kinds, numbered like the old fsm() final states (see get_token)
+REAL, INTEGER, SEPARATOR, OPERATOR, KEYWORD, IDENTIFIER, UNKNOWN = range(4, 11)
+
+class CharClasses(dict):
+	# Maps ord(char) -> class for str.translate(), anything past latin-1
+	# is classified on demand
+	def __missing__(self, o):
+		return C_SPACE if chr(o).isspace() else C_OTHER
+
+CHAR_CLASS = CharClasses()
+for o in range(256):
+	c = chr(o)
+	if c == "\n":
+		CHAR_CLASS[o] = C_NEWLINE
+	elif c.isspace():
+		CHAR_CLASS[o] = C_SPACE
+	elif c in ",;(){}":
+		CHAR_CLASS[o] = C_SEPARATOR
+	elif c in "<>/+*-":
+		CHAR_CLASS[o] = C_OPERATOR
+	elif c in "!|":
+		CHAR_CLASS[o] = C_BANG
+	elif c == "=":
+		CHAR_CLASS[o] = C_EQUAL
+	elif c == "$":
+		CHAR_CLASS[o] = C_DOLLAR
+	elif "0" <= c <= "9":
+		CHAR_CLASS[o] = C_DIGIT
+	elif c == ".":
+		CHAR_CLASS[o] = C_DOT
+	elif "a" <= c <= "z":
+		CHAR_CLASS[o] = C_LETTER
+	else:
+		CHAR_CLASS[o] = C_OTHER
+
+# DFA states
+S_START, S_DOLLAR, S_BANG, S_EQUAL, S_INT, S_INTDOT, S_REAL, S_BADNUM, \
+	S_WORD, S_WORDDIGIT, S_BADWORD = range(11)
+
+# Transition entries: 0..63 go to that state consuming the char, negative
+# entries go to state -(v+1) unless the lexeme so far is a keyword, and
+# ACCEPT entries end the token as kind with one of the modes below
+ACCEPT = 64
+PUSHBACK, INCLUDE, DROP = range(3)
+
+def accept(kind, mode=PUSHBACK):
+	return ACCEPT | (kind << 2) | mode
+
+def dfa_row(default, **cells):
+	row = [default] * (C_EOF + 1)
+	for name, value in cells.items():
+		for k in CLASS_GROUPS[name]:
+			row[k] = value
+	return row
+
+CLASS_GROUPS = {
+	"other": [C_OTHER], "space": [C_SPACE, C_NEWLINE, C_EOF], "separator": [C_SEPARATOR],
+	"operator": [C_OPERATOR], "bang": [C_BANG], "equal": [C_EQUAL], "dollar": [C_DOLLAR],
+	"digit": [C_DIGIT], "dot": [C_DOT], "letter": [C_LETTER],
+	"symbol": [C_SEPARATOR, C_OPERATOR, C_SPACE, C_NEWLINE, C_EOF],
+}
+
+DFA = [None] * (S_BADWORD + 1)
+DFA[S_START] = dfa_row(accept(UNKNOWN, INCLUDE), separator=accept(SEPARATOR, INCLUDE),
+	operator=accept(OPERATOR, INCLUDE), bang=S_BANG, equal=S_EQUAL, dollar=S_DOLLAR,
+	digit=S_INT, dot=S_BADNUM, letter=S_WORD)
+DFA[S_DOLLAR] = dfa_row(accept(UNKNOWN), dollar=accept(SEPARATOR, INCLUDE))
+DFA[S_BANG] = dfa_row(accept(UNKNOWN, DROP), equal=accept(OPERATOR, INCLUDE), space=accept(UNKNOWN))
+DFA[S_EQUAL] = dfa_row(accept(OPERATOR), equal=accept(OPERATOR, INCLUDE))
+DFA[S_INT] = dfa_row(S_BADNUM, digit=S_INT, dot=S_INTDOT, symbol=accept(INTEGER))
+DFA[S_INTDOT] = dfa_row(S_BADNUM, digit=S_REAL, space=accept(UNKNOWN))
+DFA[S_REAL] = dfa_row(accept(REAL), digit=S_REAL)
+DFA[S_BADNUM] = dfa_row(S_BADNUM, space=accept(UNKNOWN))
+DFA[S_WORD] = dfa_row(-(S_BADWORD+1), letter=S_WORD, digit=-(S_WORDDIGIT+1), symbol=accept(IDENTIFIER))
+DFA[S_WORDDIGIT] = dfa_row(S_BADWORD, letter=S_WORD, digit=S_WORDDIGIT, space=accept(UNKNOWN))
+DFA[S_BADWORD] = dfa_row(S_BADWORD, space=accept(UNKNOWN))
+
+def get_token(n):
+	# State 1, 2, 3 are non-accepting states
+	if n == 1 or n == 2 or n == 3:
+		token = None
+	elif n == 4:
+		token = "real"
+	elif n == 5:
+		token = "integer"
+	elif n == 6:
+		token = "separator"
+	elif n == 7:
+		token = "operator"
+	elif n == 8:
+		token = "keyword"
+	elif n == 9:
+		token = "identifier"
+	else:
+		token = "unknown"
+	return token
+
+
+class Source:
+	# Whole source file held in memory, lowercased once and walked by index
+	def __init__(self, text, tokens=None):
+		self.text = text.lower()
+		self.size = len(self.text)
+		self.pos = 0
+		self.line = 1
+		self.trace = False
+		# Span of the last token returned by fsm()
+		self.start = 0
+		self.end = 0
+		# Token cache filled by a tee'd stage 1 pass and replayed by stage 3,
+		# complete once the lexer reached EOF (or handed in pre-lexed)
+		self.tokens = tokens
+		self.complete = tokens is not None
+		self.cursor = 0
+		# One class code per char plus an EOF sentinel, so the DFA never
+		# looks at the text itself or bounds-checks the index
+		if tokens is None:
+			self.classes = self.text.translate(CHAR_CLASS).encode("latin-1") + bytes([C_EOF])
+
+
+def open_source(filename):
+	# Text mode keeps universal newlines, same as the old per-char reads
+	with open(filename, 'r') as f:
+		return Source(f.read())
+
+
+# Compact token record: kind code (see get_token), span in the source
+# text and line number
+Token = namedtuple("Token", "kind start end line")
+
+
+class TokenArray:
+	# Column-oriented token stream, four machine ints per token
+	def __init__(self, text=""):
+		self.text = text
+		self.kind = array('i')
+		self.start = array('i')
+		self.end = array('i')
+		self.line = array('i')
+
+	def __len__(self):
+		return len(self.kind)
+
+	def __getitem__(self, i):
+		return Token(self.kind[i], self.start[i], self.end[i], self.line[i])
+
+	def __iter__(self):
+		return map(Token, self.kind, self.start, self.end, self.line)
+
+	def append(self, kind, start, end, line):
+		self.kind.append(kind)
+		self.start.append(start)
+		self.end.append(end)
+		self.line.append(line)
+
+	def lexeme(self, i):
+		return self.text[self.start[i]:self.end[i]]
+
+
+def tokenize(source):
+	# Stream Token records from a Source or a string
+	f = source if isinstance(source, Source) else Source(source)
+	while True:
+		kind = fsm(f)
+		if kind == None:
+			return
+		yield Token(kind, f.start, f.end, f.line)
+
+
+def tokenize_array(source):
+	# Lex a whole Source or string into a TokenArray
+	f = source if isinstance(source, Source) else Source(source)
+	tokens = TokenArray(f.text)
+	append = tokens.append
+	while True:
+		kind = fsm(f)
+		if kind == None:
+			return tokens
+		append(kind, f.start, f.end, f.line)
+
+
+def split_points(text, parts):
+	# Offsets cutting text into about parts pieces, each just past a
+	# newline. Every DFA row ends the token at a newline and pushes it
+	# back, so no token ($$, == and != included) spans a cut and the
+	# lexer is in S_START there, as in a sequential run
+	points = [0]
+	for i in range(1, parts):
+		cut = text.find("\n", max(points[-1], len(text) * i // parts)) + 1
+		if cut == 0:
+			break
+		points.append(cut)
+	return points
+
+
+def lex_chunk_columns(text, offset, line):
+	# Token columns of a piece of a larger text, which starts at offset
+	# on line; runs in a worker of tokenize_parallel()
+	f = Source(text)
+	f.line = line
+	tokens = tokenize_array(f)
+	if offset:
+		return tokens.kind, shift_column(tokens.start, offset), shift_column(tokens.end, offset), tokens.line
+	return tokens.kind, tokens.start, tokens.end, tokens.line
+
+
+def tokenize_parallel(source, jobs=None, chunk=lex_chunk):
+	# Lex a whole Source or string into a TokenArray on up to jobs
+	# processes, one piece of at least chunk chars each, and join the
+	# pieces in order. Same tokens as tokenize_array(), which does the
+	# work when there is only one piece; a Source is left at EOF either way
+	from concurrent.futures import ProcessPoolExecutor
+	f = source if isinstance(source, Source) else Source(source)
+	points = split_points(f.text, min(jobs or os.cpu_count() or 1, f.size // chunk))
+	if len(points) == 1:
+		return tokenize_array(f)
+
+	lines = [1]
+	for a, b in zip(points, points[1:]):
+		lines.append(lines[-1] + f.text.count("\n", a, b))
+	pieces = [f.text[a:b] for a, b in zip(points, points[1:] + [f.size])]
+	tokens = TokenArray(f.text)
+	with ProcessPoolExecutor(len(pieces)) as pool:
+		for columns in pool.map(lex_chunk_columns, pieces, points, lines):
+			for column, values in zip((tokens.kind, tokens.start, tokens.end, tokens.line), columns):
+				column.extend(values)
+	f.pos = f.size
+	f.line = lines[-1] + f.text.count("\n", points[-1])
+	return tokens
+
+
+def common_affixes(a, b):
+	# Lengths of the common prefix and (non-overlapping) common suffix of
+	# two strings, by binary search over slice compares. Only the part
+	# not yet known to match is compared, so the copies halve each step
+	lo, hi = 0, min(len(a), len(b))
+	while lo < hi:
+		mid = (lo + hi + 1) // 2
+		if a[lo:mid] == b[lo:mid]:
+			lo = mid
+		else:
+			hi = mid - 1
+	prefix = lo
+	lo, hi = 0, min(len(a), len(b)) - prefix
+	while lo < hi:
+		mid = (lo + hi + 1) // 2
+		if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+			lo = mid
+		else:
+			hi = mid - 1
+	return prefix, lo
+
+
+def shift_column(column, shift):
+	# Add shift to every value of an array('i') with a single big int
+	# addition over its bytes. Values are non-negative before and after,
+	# so no lane carries or borrows into its neighbour
+	data = column.tobytes()
+	lanes = int.from_bytes(abs(shift).to_bytes(column.itemsize, sys.byteorder) * len(column), sys.byteorder)
+	value = int.from_bytes(data, sys.byteorder)
+	value = value + lanes if shift > 0 else value - lanes
+	result = array(column.typecode)
+	result.frombytes(value.to_bytes(len(data), sys.byteorder))
+	return result
+
+
+def relex(source, text):
+	# Lex an edited version of a fully lexed Source, reusing its tokens.
+	# Tokens that end well before the first changed char are kept, the
+	# last of them is lexed again to restart the DFA from a known state,
+	# and lexing stops at the first token that starts in the unchanged
+	# tail where an old token started: from there on both streams agree
+	# up to a shift in position and line. Returns the new Source and the
+	# number of tokens lexed
+	from bisect import bisect_left, bisect_right
+	old = source.tokens
+	f = Source(text)
+	prefix, suffix = common_affixes(source.text, f.text)
+	delta = f.size - source.size
+	tail = f.size - suffix
+
+	# fsm() may look one char past a token and drop it, hence the margin
+	keep = max(0, bisect_right(old.end, prefix - 2) - 1)
+	if keep > 0:
+		f.pos = old.start[keep]
+		f.line = old.line[keep]
+	tokens = TokenArray(f.text)
+	for column in ("kind", "start", "end", "line"):
+		getattr(tokens, column).extend(getattr(old, column)[:keep])
+
+	append = tokens.append
+	lexed = 0
+	j = len(old)
+	while True:
+		kind = fsm(f)
+		if kind == None:
+			break
+		if f.start >= tail:
+			j = bisect_left(old.start, f.start - delta)
+			if j < len(old) and old.start[j] == f.start - delta:
+				break
+			j = len(old)
+		append(kind, f.start, f.end, f.line)
+		lexed += 1
+
+	if j < len(old):
+		lines = f.line - old.line[j]
+		tokens.kind.extend(old.kind[j:])
+		for column, shift in (("start", delta), ("end", delta), ("line", lines)):
+			rest = getattr(old, column)[j:]
+			getattr(tokens, column).extend(shift_column(rest, shift) if shift else rest)
+		f.line = source.line + lines
+
+	f.tokens = tokens
+	f.complete = True
+	return f, lexed
+
+
+def fsm(f):
+	# Advance past the next token and return its kind, or None at EOF;
+	# the token spans f.text[f.start:f.end]
+	classes = f.classes
+	pos = f.pos
+
+	# Skip whitespace between tokens
+	k = classes[pos]
+	while k == C_SPACE or k == C_NEWLINE:
+		if k == C_NEWLINE:
+			f.line += 1
+		pos += 1
+		k = classes[pos]
+	if k == C_EOF:
+		f.pos = pos
+		return None
+
+	# Table-driven DFA, one transition per char
+	start = pos
+	state = S_START
+	row = DFA[state]
+	trace = f.trace
+	while True:
+		k = classes[pos]
+		v = row[k]
+		if trace and k != C_SPACE and k != C_NEWLINE and k != C_EOF:
+			print("{0:2} {1:4} {2:15} {3:10} {4:10} {5}".format("", "=> ", f.text[pos:pos+1], "", "state: ", state))
+		if 0 <= v < ACCEPT:
+			state = v
+			row = DFA[v]
+			pos += 1
+		elif v >= ACCEPT:
+			break
+		elif f.text[start:pos] in KEYWORDS:
+			v = accept(KEYWORD)
+			break
+		else:
+			state = -v-1
+			row = DFA[state]
+			pos += 1
+
+	mode = v & 3
+	kind = (v >> 2) & 15
+	if mode == INCLUDE:
+		pos += 1
+	f.start = start
+	f.end = pos
+	if mode == DROP:
+		pos += 1
+	f.pos = pos
+
+	if kind == IDENTIFIER and f.text[start:f.end] in KEYWORDS:
+		kind = KEYWORD
+
+	return kind
@@ -0,0 +1,155 @@
+# Output rows in the text, tsv and ndjson formats
+
+
+class Sink:
+	# Collects formatted rows and hands them to the stream in bulk
+	def __init__(self, stream, limit=8192):
+		self.stream = stream
+		self.limit = limit
+		self.parts = []
+
+	def write(self, text):
+		parts = self.parts
+		parts.append(text)
+		if len(parts) >= self.limit:
+			self.flush()
+
+	def flush(self):
+		if self.parts:
+			self.stream.write("".join(self.parts))
+			self.parts = []
+
+
+class Prefixes(dict):
+	# Formats the fixed part of a row once per key (token kind, op name)
+	def __init__(self, template):
+		self.template = template
+
+	def __missing__(self, key):
+		text = self[key] = self.template.format(key)
+		return text
+
+
+class TextRows:
+	# The historical layout; ansi adds the bold styling used on stdout,
+	# formatted here once rather than per row
+	def __init__(self, ansi):
+		bold, off = ("\033[1m", "\033[0m") if ansi else ("", "")
+		self.tokens = Prefixes("{0:15} ")
+		self.bolds = Prefixes(bold + "Token: {0:15} Lexeme: ")
+		self.bold_end = off + "\n"
+		self.ops = Prefixes("      {0:15}   ")
+		self.banner = "\n===========================\n\n"
+		self.lexer = "TOKEN \t\t LEXEME\n"
+		if ansi:
+			self.listing = bold + "{0}    {1:10} {2}".format("Address", "Op\t", "  oprnd") + off + "\n"
+			self.symbols = "\n" + bold + "{0} {1:10} {2}".format("Identifier", "MemoryLocation", "Type") + off + "\n"
+			self.constants = "\n" + bold + "{0} {1:10} {2}".format("Constant  ", "PoolIndex     ", "Type") + off + "\n"
+			self.references = bold + "{0} {1:10} {2}".format("Identifier", "MemoryLocation", "References") + off + "\n"
+		else:
+			self.listing = "{0} {1:10} {2}\n".format("Address", "  Op\t", "  oprnd")
+			self.symbols = "\n{0} {1:10} {2}\n".format("Identifier", "MemoryLocation", "Type")
+			self.constants = "\n{0} {1:10} {2}\n".format("Constant  ", "PoolIndex     ", "Type")
+			self.references = "{0} {1:10} {2}\n".format("Identifier", "MemoryLocation", "References")
+
+	def token(self, token, lexeme, line):
+		return self.tokens[token] + lexeme + "\n"
+
+	def bold(self, token, lexeme, line):
+		return self.bolds[token] + lexeme + self.bold_end
+
+	def rule(self, text):
+		return "  " + text + "\n"
+
+	def row(self, addr, op, oprnd):
+		return "{0:3}".format(addr) + self.ops[op] + str(oprnd) + "\n"
+
+	def legend(self, name, addr, kind):
+		return "{0:3}      {1:15}   {2}\n".format(name, addr, kind)
+
+	reference = legend
+
+	def constant(self, value, index, kind):
+		return "{0:<10} {1:>9}      {2}\n".format(repr(value), index, kind)
+
+	def source(self, line, text):
+		return "; {0:4} {1}\n".format(line, text)
+
+
+class TsvRows:
+	# One tab separated record per row, tagged with its record type
+	banner = lexer = listing = symbols = references = constants = ""
+
+	def token(self, token, lexeme, line):
+		return "token\t{0}\t{1}\t{2}\n".format(token, lexeme, line)
+
+	bold = token
+
+	def rule(self, text):
+		return "rule\t" + text + "\n"
+
+	def row(self, addr, op, oprnd):
+		return "instr\t{0}\t{1}\t{2}\n".format(addr, op, oprnd)
+
+	def legend(self, name, addr, kind):
+		return "symbol\t{0}\t{1}\t{2}\n".format(name, addr, kind)
+
+	def reference(self, name, addr, count):
+		return "reference\t{0}\t{1}\t{2}\n".format(name, addr, count)
+
+	def constant(self, value, index, kind):
+		return "constant\t{0}\t{1}\t{2}\n".format(value, index, kind)
+
+	def source(self, line, text):
+		# Tabs in the line would split the record
+		return "source\t{0}\t{1}\n".format(line, text.expandtabs())
+
+
+class Quotes(dict):
+	# JSON string literals, quoted once per distinct lexeme
+	def __missing__(self, text):
+		import json
+		quoted = self[text] = json.dumps(text)
+		return quoted
+
+
+class NdjsonRows:
+	# One JSON object per line, with the same record types as TsvRows
+	banner = lexer = listing = symbols = references = constants = ""
+
+	def __init__(self):
+		self.tokens = Prefixes('{{"record": "token", "token": "{0}", "lexeme": ')
+		self.lexemes = Quotes()
+		self.quote = self.lexemes.__getitem__
+
+	def token(self, token, lexeme, line):
+		return self.tokens[token] + self.lexemes[lexeme] + ', "line": ' + str(line) + "}\n"
+
+	bold = token
+
+	def rule(self, text):
+		return '{{"record": "rule", "rule": {0}}}\n'.format(self.quote(text))
+
+	def row(self, addr, op, oprnd):
+		if oprnd == "" or oprnd == None:
+			oprnd = "null"
+		elif type(oprnd) is not int:
+			oprnd = self.quote(oprnd)
+		return '{{"record": "instr", "address": {0}, "op": "{1}", "oprnd": {2}}}\n'.format(addr, op, oprnd)
+
+	def legend(self, name, addr, kind):
+		return '{{"record": "symbol", "identifier": {0}, "address": {1}, "type": "{2}"}}\n'.format(self.quote(name), addr, kind)
+
+	def reference(self, name, addr, count):
+		return '{{"record": "reference", "identifier": {0}, "address": {1}, "references": {2}}}\n'.format(self.quote(name), addr, count)
+
+	def constant(self, value, index, kind):
+		return '{{"record": "constant", "value": {0!r}, "index": {1}, "type": "{2}"}}\n'.format(value, index, kind)
+
+	def source(self, line, text):
+		# Lines are mostly distinct, not worth keeping in the quote cache
+		import json
+		return '{{"record": "source", "line": {0}, "text": {1}}}\n'.format(line, json.dumps(text))
+
+
+FORMATS = {"text": None, "tsv": TsvRows, "ndjson": NdjsonRows}
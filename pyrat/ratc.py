@@ -0,0 +1,171 @@
+# Compiled object files (.ratc): the instruction table, constant pool,
+# symbols and optionally the line table of one compilation
+
+import sys, struct
+from array import array
+from collections import namedtuple
+
+from .assembly import OPCODES, InstrBuffer, LineTable, SymbolTable
+
+
+# Layout, all little-endian: the header, then the sections in this order,
+# each starting on an 8 byte boundary
+#   ops        opcode per instruction, one byte
+#   flags      operand flag per instruction (F_NONE, F_INT, F_STR), one byte
+#   operands   int64 per instruction, an index into strings for F_STR
+#   strings    count, then per operand a tag (0 text, 1 integer), length
+#              and UTF-8 text
+#   constants  float64 per pool entry
+#   symbols    count, then per identifier its address, reference count,
+#              name length and UTF-8 name; then a type code per memory cell
+#              from base to next (0 undeclared, else 1 + QUALIFIERS index)
+#   lines      when flags has HAS_LINES: the table size, then the
+#              LineTable columns addr, line, first and last, int32 per run.
+#              Raw rather than LineTable.encode() so they load as views too
+MAGIC = b"RATC\r\n\x1a\n"
+FORMAT = 1
+HAS_LINES = 1
+SECTIONS = ("ops", "flags", "operands", "strings", "constants", "symbols", "lines")
+HEADER = struct.Struct("<8sHHIII" + "QQ" * len(SECTIONS))
+TYPES = (None, "integer", "boolean", "real")
+SUFFIX = ".ratc"
+
+Object = namedtuple("Object", "table symbols lines")
+
+
+def little(column):
+	# Column bytes in file order
+	if sys.byteorder == "little":
+		return column.tobytes()
+	column = array(column.typecode, column.tobytes())
+	column.byteswap()
+	return column.tobytes()
+
+
+def encode_object(table, symbols, lines=None):
+	strings = bytearray(struct.pack("<I", len(table.strings)))
+	for value in table.strings:
+		text = str(value).encode()
+		strings += struct.pack("<BI", 0 if type(value) is str else 1, len(text)) + text
+
+	named = bytearray(struct.pack("<I", len(symbols.ids)))
+	for lexeme, addr in symbols.ids.items():
+		name = lexeme.encode()
+		named += struct.pack("<IIH", addr, symbols.refs[addr], len(name)) + name
+	named += bytes(TYPES.index(symbols.types.get(addr)) for addr in range(symbols.base, symbols.next))
+
+	oprnd = table.oprnd if isinstance(table.oprnd, array) else array('q', table.oprnd)
+	sections = [bytes(table.op), bytes(table.flags), little(oprnd), bytes(strings),
+	            little(array('d', symbols.constants)), bytes(named), encode_lines(lines)]
+	layout = []
+	offset = HEADER.size
+	for data in sections:
+		offset += -offset % 8
+		layout += [offset, len(data)]
+		offset += len(data)
+
+	out = bytearray(HEADER.pack(MAGIC, FORMAT, HAS_LINES if lines is not None else 0, len(table), symbols.base, symbols.next, *layout))
+	for data, start in zip(sections, layout[::2]):
+		out += bytes(start - len(out)) + data
+	return bytes(out)
+
+
+def write_object(path, table, symbols, lines=None):
+	# Returns the size written
+	data = encode_object(table, symbols, lines)
+	with open(path, 'wb') as f:
+		f.write(data)
+	return len(data)
+
+
+def load_object(path):
+	# Map a .ratc file read-only. The instruction columns, constants and
+	# line table of the result are views of the mapping, nothing is
+	# copied; strings and symbols are decoded. Raises ValueError for
+	# anything that is not a well-formed object
+	import mmap
+	with open(path, 'rb') as f:
+		try:
+			data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+		except ValueError:
+			data = memoryview(b"")
+	return decode_object(data)
+
+
+def decode_object(data):
+	if len(data) < HEADER.size or bytes(data[:len(MAGIC)]) != MAGIC:
+		raise ValueError("not a .ratc file")
+	fields = HEADER.unpack_from(data)
+	magic, format, flags, count, base, next = fields[:6]
+	if format > FORMAT:
+		raise ValueError("object format {0}, this compiler reads up to {1}".format(format, FORMAT))
+	section = {}
+	for name, start, size in zip(SECTIONS, fields[6::2], fields[7::2]):
+		if start + size > len(data):
+			raise ValueError("truncated in the {0} section".format(name))
+		section[name] = data[start:start + size]
+	if len(section["ops"]) != count or len(section["flags"]) != count or len(section["operands"]) != 8 * count or len(section["constants"]) % 8:
+		raise ValueError("sections do not match {0} instructions".format(count))
+
+	table = InstrBuffer()
+	table.op = section["ops"]
+	table.flags = section["flags"]
+	table.oprnd = column('q', section["operands"])
+	if count and (max(table.op) >= len(OPCODES) or max(table.flags) > 2):
+		raise ValueError("unknown opcode or operand flag")
+	try:
+		strings = section["strings"]
+		n, = struct.unpack_from("<I", strings)
+		at = 4
+		for i in range(n):
+			tag, size = struct.unpack_from("<BI", strings, at)
+			text = bytes(strings[at + 5:at + 5 + size]).decode()
+			table.strings.append(int(text) if tag else text)
+			at += 5 + size
+
+		symbols = SymbolTable(base)
+		named = section["symbols"]
+		n, = struct.unpack_from("<I", named)
+		at = 4
+		for i in range(n):
+			addr, refs, size = struct.unpack_from("<IIH", named, at)
+			symbols.ids[bytes(named[at + 10:at + 10 + size]).decode()] = addr
+			symbols.refs[addr] = refs
+			at += 10 + size
+		if len(named) != at + next - base:
+			raise IndexError
+		for addr, code in enumerate(named[at:], base):
+			if TYPES[code] is not None:
+				symbols.types[addr] = TYPES[code]
+		symbols.next = next
+	except (struct.error, UnicodeDecodeError, IndexError):
+		raise ValueError("damaged strings or symbols section")
+	symbols.constants = column('d', section["constants"])
+
+	lines = decode_lines(section["lines"]) if flags & HAS_LINES else LineTable()
+	return Object(table, symbols, lines)
+
+
+def encode_lines(lines):
+	if lines is None:
+		return b""
+	return struct.pack("<I", lines.size) + b"".join(little(array('i', column)) for column in (lines.addr, lines.line, lines.first, lines.last))
+
+
+def decode_lines(data):
+	if len(data) < 4 or (len(data) - 4) % 16:
+		raise ValueError("damaged lines section")
+	lines = LineTable()
+	lines.size, = struct.unpack_from("<I", data)
+	n = (len(data) - 4) // 4
+	lines.addr, lines.line, lines.first, lines.last = (column('i', data[4 + k * n:4 + k * n + n]) for k in range(4))
+	return lines
+
+
+def column(typecode, data):
+	# View of little-endian values in place, a swapped copy elsewhere
+	if sys.byteorder == "little":
+		return data.cast(typecode)
+	values = array(typecode, data.tobytes())
+	values.byteswap()
+	return values
@@ -0,0 +1,189 @@
+# Grammar rules and the listeners the parser reports them to, profiling
+
+import os
+
+
+# Parse tracing
+RAT15SU = "<Rat15su> ::= $$ <Opt Function Definitions> $$ <Opt Declaration List> <Statement List> $$"
+RULES = (
+	RAT15SU,
+	"<Opt Declaration List> ::= <Declaration List>",
+	"<Declaration List> ::= <Declaration>;",
+	"<Declaration> ::= integer",
+	"<Declaration> ::= boolean",
+	"<Declaration> ::= real",
+	"<Qualifier> ::= integer",
+	"<Qualifier> ::= boolean",
+	"<Qualifier> ::= real",
+	"<Statement List> ::= <Statement>",
+	"<Statement> ::= <Assign>",
+	"<Statement> ::= <If>",
+	"<Statement> ::= <While>",
+	"<Statement> ::= <Read>",
+	"<Statement> ::= <Write>",
+	"<Statement> ::= <Compound>",
+	"<Statement> ::= <Else>",
+	"<Assign> ::= <Identifier> = <Expression>",
+	"<Expression> := <Term> <Expression Prime>",
+	"<Expression Prime> := + <Term> <Expression Prime>",
+	"<Expression Prime> := - <Term> <Expression Prime>",
+	"<Expression Prime> := ɛ",
+	"<Term> := <Factor> <Term Prime>",
+	"<Term Prime> := * <Factor>",
+	"<Term Prime> := / <Factor>",
+	"<Term Prime> := ɛ",
+	"<Factor> := <Identifier>",
+	"<Factor> := <Integer>",
+	"<Factor> := true",
+	"<Factor> := false",
+	"<Read> ::= read ( <IDs> );",
+	"<IDs> ::= <Identifier>",
+	"<Opt Function Definitions> ::= <Function Definitions>",
+	"<Function> ::= function <Identifier> ( <Opt Parameter List> ) <Opt Declaration List> <Body>",
+	"<Parameter> ::= <IDs> <Qualifier>",
+	"<Body> ::= { <Statement List> }",
+	"<Statement> ::= <Return>",
+	"<Return> ::= return ;",
+	"<Return> ::= return <Expression> ;",
+	"<Factor> := ( <Expression> )",
+	"<Factor> := <Identifier> ( <IDs> )",
+	"<Factor> := <Real>",
+	"<Declaration List> ::= <Declaration>; <Declaration List>",
+)
+# Rule ids, in the order of RULES, for the parser to report
+R_RAT15SU, R_OPT_DECLARATIONS, R_DECLARATION_LIST, R_DECLARE_INTEGER, R_DECLARE_BOOLEAN, R_DECLARE_REAL, \
+	R_QUALIFIER_INTEGER, R_QUALIFIER_BOOLEAN, R_QUALIFIER_REAL, R_STATEMENT_LIST, R_ASSIGN_STATEMENT, R_IF_STATEMENT, \
+	R_WHILE_STATEMENT, R_READ_STATEMENT, R_WRITE_STATEMENT, R_COMPOUND_STATEMENT, R_ELSE_STATEMENT, R_ASSIGN, \
+	R_EXPRESSION, R_EXPRESSION_ADD, R_EXPRESSION_SUB, R_EXPRESSION_EMPTY, R_TERM, R_TERM_MUL, R_TERM_DIV, R_TERM_EMPTY, \
+	R_FACTOR_IDENTIFIER, R_FACTOR_INTEGER, R_FACTOR_TRUE, R_FACTOR_FALSE, R_READ, R_IDS, R_OPT_FUNCTIONS, R_FUNCTION, \
+	R_PARAMETER, R_BODY, R_RETURN_STATEMENT, R_RETURN, R_RETURN_VALUE, R_FACTOR_PAREN, R_FACTOR_CALL, R_FACTOR_REAL, \
+	R_DECLARATION_LISTS = range(len(RULES))
+# The rule for a qualifier, operator or boolean literal the parser has in hand
+QUALIFIER_RULES = {"integer": R_QUALIFIER_INTEGER, "boolean": R_QUALIFIER_BOOLEAN, "real": R_QUALIFIER_REAL}
+OPERATOR_RULES = {"+": R_EXPRESSION_ADD, "-": R_EXPRESSION_SUB, "*": R_TERM_MUL, "/": R_TERM_DIV}
+FACTOR_RULES = {"true": R_FACTOR_TRUE, "false": R_FACTOR_FALSE}
+
+
+class Listener:
+	# Parser events: rule is an index into RULES, token and lexeme are
+	# the token just read, line is the source line. The parser only
+	# emits them while a listener is registered, so tracing costs
+	# nothing when it is off
+	def rule(self, rule, line):
+		pass
+
+	def token(self, token, lexeme, line):
+		pass
+
+
+class RowListener(Listener):
+	# The --verbose rows: rules and tokens through the compiler's sink
+	def __init__(self, c):
+		self.c = c
+
+	def rule(self, rule, line):
+		self.c.sink.write(self.c.style.rule(RULES[rule]))
+
+	def token(self, token, lexeme, line):
+		self.c.sink.write(self.c.style.bold(token, lexeme, line))
+
+
+class RuleListener(RowListener):
+	# The --rules unit tests: rules are compared, tokens still printed
+	def rule(self, rule, line):
+		c = self.c
+		c.errors = c.compare_rule(c.count, RULES[rule], c.unit)
+		c.count += 1
+
+
+class Profile(Listener):
+	# Wall and CPU seconds per compiler phase plus the work counters
+	# behind them, for --profile. Listens to the parser to count rules
+	def __init__(self):
+		import time
+		self.clock = time.perf_counter
+		self.cpu = time.process_time
+		self.phases = {}
+		self.counts = {"characters": 0, "tokens": 0, "rules": 0, "instructions": 0, "symbols": 0}
+		self.begin()
+		self.started = (self.wall, self.used)
+
+	def begin(self):
+		self.wall = self.clock()
+		self.used = self.cpu()
+		self.applied = 0
+
+	def rule(self, rule, line):
+		self.applied += 1
+
+	def lap(self, phase):
+		# Charge the time since the last lap to phase
+		wall = self.clock()
+		used = self.cpu()
+		total = self.phases.setdefault(phase, [0.0, 0.0])
+		total[0] += wall - self.wall
+		total[1] += used - self.used
+		self.wall = wall
+		self.used = used
+
+	def tally(self, c):
+		f = c.source
+		counts = {
+			"characters": f.size if f else 0,
+			"tokens": len(f.tokens) if f and f.tokens is not None else 0,
+			"rules": self.applied,
+			"instructions": len(c.table) + c.removed,
+			"symbols": len(c.symbols),
+		}
+		for name, value in counts.items():
+			self.counts[name] = max(self.counts[name], value)
+
+	def report(self, stream):
+		stream.write("==> profile\n")
+		stream.write("{0:15} {1:>10} {2:>10}\n".format("phase", "wall s", "cpu s"))
+		for phase, (wall, used) in self.phases.items():
+			stream.write("{0:15} {1:10.4f} {2:10.4f}\n".format(phase, wall, used))
+		stream.write("{0:15} {1:10.4f} {2:10.4f}\n".format("total", self.clock() - self.started[0], self.cpu() - self.started[1]))
+		for name, value in self.counts.items():
+			stream.write("{0:15} {1:10}\n".format(name, value))
+		for name, phase in (("tokens", "lexer"), ("instructions", "codegen")):
+			if self.phases.get(phase, [0])[0] > 0:
+				stream.write("{0:15} {1:10.0f}\n".format(name + "/s", self.counts[name] / self.phases[phase][0]))
+
+
+def collapse(profiler, depth=64):
+	# Collapsed stacks ("outer;inner microseconds") for flame graph tools
+	# from a cProfile run. cProfile keeps caller edges rather than whole
+	# stacks, so a function's time is split between its callers in
+	# proportion to the time each edge accounts for; recursion is cut
+	import pstats
+	stats = pstats.Stats(profiler).stats
+	children = {}
+	for func, (cc, nc, tt, ct, callers) in stats.items():
+		for caller, edge in callers.items():
+			children.setdefault(caller, []).append((func, edge[3]))
+
+	def label(func):
+		filename, line, name = func
+		if filename == "~":
+			return name
+		return "{0} ({1}:{2})".format(name, os.path.basename(filename), line)
+
+	stacks = {}
+	def walk(func, spent, path, seen):
+		cc, nc, tt, ct, callers = stats[func]
+		path = path + [label(func)]
+		share = spent / ct if ct > 0 else 0.0
+		micros = int(tt * share * 1e6)
+		if micros > 0:
+			key = ";".join(path)
+			stacks[key] = stacks.get(key, 0) + micros
+		if len(path) < depth:
+			for child, edge in children.get(func, ()):
+				if child not in seen and edge * share >= 1e-6:
+					walk(child, edge * share, path, seen | {child})
+
+	for func, (cc, nc, tt, ct, callers) in stats.items():
+		if not callers:
+			walk(func, ct, [], {func})
+	return ["{0} {1}".format(key, value) for key, value in sorted(stacks.items())]